@@ -0,0 +1,8 @@
+"""
+Micro-benchmarks of hot serialization paths, run from the config directory:
+
+    python -m benchmarks [--output results.json] [--save-baseline] [name ...]
+
+Results are compared against benchmarks/baseline.json, recorded on the
+same machine with --save-baseline before the changes being measured.
+"""
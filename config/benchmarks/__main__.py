@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+# results slower than the baseline by more than this factor are regressions
+TOLERANCE = 1.2
+
+
+def measure(operation, repeat, min_time):
+    """Seconds per call of every repeat, calls are looped for at least `min_time`."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        timings.append((time.perf_counter() - started) / loops)
+    return timings, loops
+
+
+def run(cases, repeat, min_time):
+    results = {}
+    for name, build_case in cases.items():
+        operation, items = build_case()
+        timings, loops = measure(operation, repeat, min_time)
+        seconds = statistics.median(timings)
+        results[name] = {
+            "seconds": seconds,
+            "min_seconds": min(timings),
+            "items": items,
+            "items_per_second": items / seconds,
+            "loops": loops,
+            "repeat": repeat,
+        }
+        print(f"{name}: {seconds * 1000:.3f} ms, {items / seconds:.0f} items/s")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against the baseline, return names of regressions."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name}: no baseline")
+            continue
+        ratio = result["seconds"] / baseline[name]["seconds"]
+        if ratio > tolerance:
+            status = "SLOWER"
+            regressions.append(name)
+        elif ratio < 1 / tolerance:
+            status = "faster"
+        else:
+            status = "same"
+        print(f"{name}: {ratio:.2f}x of the baseline, {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Run micro-benchmarks."
+    )
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, all by default.")
+    parser.add_argument("--output", help="Path of a JSON file to save results to.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save results as the baseline instead of comparing them.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimal seconds of one repeat, calls are looped to reach it.",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+    from benchmarks.cases import CASES
+
+    unknown = set(options.names) - CASES.keys()
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+    cases = {
+        name: build_case
+        for name, build_case in CASES.items()
+        if not options.names or name in options.names
+    }
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+        "results": run(cases, options.repeat, options.min_time),
+    }
+    if options.output:
+        Path(options.output).write_text(json.dumps(report, indent=2) + "\n")
+
+    if options.save_baseline:
+        baseline = {}
+        if options.baseline.exists():
+            baseline = json.loads(options.baseline.read_text())
+        # benchmarks that were not run keep their baselines
+        baseline = {**baseline.get("results", {}), **report["results"]}
+        options.baseline.write_text(
+            json.dumps({**report, "results": baseline}, indent=2) + "\n"
+        )
+        return 0
+    if not options.baseline.exists():
+        print(f"No baseline at {options.baseline}, save one with --save-baseline.")
+        return 0
+    baseline = json.loads(options.baseline.read_text())["results"]
+    return 1 if compare(report["results"], baseline, options.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
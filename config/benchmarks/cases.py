@@ -0,0 +1,173 @@
+"""
+Benchmarked operations. A case prepares its data and returns the operation
+to time with the number of items one call of it processes.
+Nothing is read from the database, places are built in memory.
+"""
+import io
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from PIL import Image
+from rest_framework.serializers import ValidationError
+
+from routes4life_api.models import Place, PlaceCategory, PlaceRating, User
+from routes4life_api.serializers import (
+    ClientValidatePlaceSerializer,
+    CreateUpdatePlaceSerializer,
+    GetPlaceSerializer,
+)
+from routes4life_api.utils import convert_placedata_to_geojson, custom_exception_handler
+from routes4life_api.validators import validate_password
+
+CASES = {}
+
+
+def case(name):
+    def decorator(func):
+        CASES[name] = func
+        return func
+
+    return decorator
+
+
+def build_user():
+    return User(id=1, email="benchmark@routes4life.test")
+
+
+def build_places(count, user):
+    """
+    Places with their author, rating and secondary images already set,
+    as prefetching would leave them. Media urls are left out,
+    their cost depends on the storage.
+    """
+    places = []
+    for number in range(count):
+        place = Place(
+            id=number + 1,
+            added_by=user,
+            name=f"Old town cafe {number}",
+            description="Coffee, pastries and a view of the old town.",
+            address=f"Lenina street {number}",
+            category=PlaceCategory.CAFES_AND_RESTAURANTS,
+            location=Point(27.56 + number / 10000, 53.9, srid=4326),
+        )
+        place._prefetched_objects_cache = {"secondary_images": []}
+        place.user_ratings = [PlaceRating(user=user, place=place, rating=Decimal(4))]
+        places.append(place)
+    return places
+
+
+def build_image():
+    content = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(content, format="PNG")
+    return SimpleUploadedFile("main.png", content.getvalue(), "image/png")
+
+
+def get_place_serializer_case(count):
+    user = build_user()
+    places = build_places(count, user)
+
+    def operation():
+        return GetPlaceSerializer(places, many=True, context={"user": user}).data
+
+    return operation, count
+
+
+@case("get_place_serializer_1k")
+def get_place_serializer_1k():
+    return get_place_serializer_case(1000)
+
+
+@case("get_place_serializer_10k")
+def get_place_serializer_10k():
+    return get_place_serializer_case(10000)
+
+
+@case("create_place_validation")
+def create_place_validation():
+    """Both validation steps of creating a place, as the view runs them."""
+    user = build_user()
+    image = build_image()
+    data = {
+        "name": "Old town cafe",
+        "description": "Coffee, pastries and a view of the old town.",
+        "address": "Lenina street 5",
+        "category": "cafesAndRestaurants",
+        "latitude": 53.9,
+        "longitude": 27.56,
+        "rating": "4.50",
+        "main_image": image,
+    }
+
+    def operation():
+        image.seek(0)
+        client_data_serializer = ClientValidatePlaceSerializer(data=data)
+        client_data_serializer.is_valid(raise_exception=True)
+        transformed_data = convert_placedata_to_geojson(
+            client_data_serializer.validated_data
+        )
+        inner_serializer = CreateUpdatePlaceSerializer(
+            data=transformed_data, context={"user": user}
+        )
+        inner_serializer.is_valid(raise_exception=True)
+
+    return operation, 1
+
+
+@case("camel_case_json_render_10k")
+def camel_case_json_render_10k():
+    operation, count = get_place_serializer_case(10000)
+    payload = operation()
+    renderer = CamelCaseJSONRenderer()
+
+    def render():
+        return renderer.render(payload)
+
+    return render, count
+
+
+@case("validate_password")
+def validate_password_case():
+    passwords = [
+        "pA$$wd12345678",
+        "Str0ng!Passw0rd-for-routes",
+        "short1!A",
+        "nouppercase1!",
+        "NOLOWERCASE1!",
+        "NoDigits!!!!",
+        "NoSpecials123",
+        "With space 1!A",
+    ]
+
+    def operation():
+        for password in passwords:
+            try:
+                validate_password(password)
+            except ValidationError:
+                pass
+
+    return operation, len(passwords)
+
+
+@case("exception_handler_deep_errors")
+def exception_handler_deep_errors():
+    """Errors of a bulk create of 100 invalid places, and one deeply nested error."""
+    place_errors = {
+        "name": ["This field is required."],
+        "category": {"category": "Unallowed category."},
+        "latitude": {"latitude": "Latitude is supposed to be between -90 and 90."},
+        "rating": ["A valid number is required."],
+    }
+    detail = {"places": [place_errors] * 100}
+    nested = "Invalid value."
+    for depth in range(50):
+        nested = {f"level_{depth}": [nested]}
+    detail["nested"] = nested
+    exc = ValidationError(detail)
+
+    def operation():
+        return custom_exception_handler(exc, {})
+
+    return operation, len(place_errors) * 100 + 1
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # geo Django
     "django.contrib.gis",
     # our app
@@ -111,6 +112,7 @@ REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": (
         "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
         "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
+        "routes4life_api.renderers.MessagePackRenderer",
         # Any other renders
     ),
     "DEFAULT_PARSER_CLASSES": (
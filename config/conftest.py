@@ -1,4 +1,5 @@
 import pytest
+from django.core.files.storage import default_storage
 
 from tests.factories import UserFactory
 
@@ -7,3 +8,9 @@ from tests.factories import UserFactory
 @pytest.fixture
 def user_factory():
     return UserFactory
+
+
+@pytest.fixture
+def unsigned_media_urls(monkeypatch):
+    # signed urls depend on the current time, so they are not comparable
+    monkeypatch.setattr(default_storage, "querystring_auth", False)
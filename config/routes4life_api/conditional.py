@@ -0,0 +1,78 @@
+import hashlib
+from datetime import timedelta
+
+from django.contrib.gis.db.models import Count, Max
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from routes4life_api.models import Place
+from routes4life_api.response_cache import get_normalized_query_string
+from routes4life_api.utils import PlaceDataVersion
+
+# keys are versioned, so this only limits how long stale validators are kept
+VALIDATOR_CACHE_TTL = timedelta(days=1)
+
+USER_VALIDATOR_FIELDS = (
+    "email",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "avatar",
+    "is_premium",
+)
+
+
+def get_places_validator(request, shared=False):
+    """
+    Data version, last change time and count of the user's places, or of all
+    places if `shared`. The aggregate is cached under the data version, so it
+    runs once per change of places instead of once per request.
+    """
+    attribute = "_shared_places_validator" if shared else "_places_validator"
+    if not hasattr(request, attribute):
+        owner = "all" if shared else request.user.id
+        version = PlaceDataVersion.get(None if shared else request.user.id)
+        key = f"places__validator__{owner}__{version}"
+        validator = cache.get(key)
+        if validator is None:
+            queryset = Place.objects.all() if shared else request.user.places.all()
+            validator = queryset.aggregate(
+                last_modified=Max("updated_at"), count=Count("id")
+            )
+            validator["version"] = version
+            cache.set(key, validator, timeout=VALIDATOR_CACHE_TTL.total_seconds())
+        setattr(request, attribute, validator)
+    return getattr(request, attribute)
+
+
+def place_condition(shared=False, with_user=False):
+    """
+    Answer conditional GET requests with 304 before the view runs.
+    The ETag covers the user, the url, the Accept header and the places
+    validator; `with_user` adds the user's data for views returning it.
+    Last-Modified is not sent for them, as users have no change time.
+    """
+
+    def get_etag(request, *args, **kwargs):
+        validator = get_places_validator(request, shared)
+        parts = [
+            request.user.id,
+            request.path,
+            get_normalized_query_string(request),
+            request.META.get("HTTP_ACCEPT", ""),
+            validator["version"],
+            validator["last_modified"],
+            validator["count"],
+        ]
+        if with_user:
+            parts.extend(
+                getattr(request.user, field) for field in USER_VALIDATOR_FIELDS
+            )
+        return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+
+    def get_last_modified(request, *args, **kwargs):
+        if with_user:
+            return None
+        return get_places_validator(request, shared)["last_modified"]
+
+    return condition(etag_func=get_etag, last_modified_func=get_last_modified)
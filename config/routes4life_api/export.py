@@ -0,0 +1,63 @@
+"""
+Streaming exports of places. Rows are read from a server-side cursor and
+serialized by chunks, the first bytes are sent before the query runs.
+"""
+import csv
+import io
+
+from routes4life_api.place_rows import PLACE_OUTPUT_FIELDS
+from routes4life_api.renderers import GeoJSONLinesRenderer, dump_json
+from routes4life_api.streaming import iter_place_chunks
+
+EXPORT_CONTENT_TYPES = {
+    "geojson": "application/geo+json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# snake case, the same columns are read by import_places
+CSV_FIELDS = tuple(
+    field for field in PLACE_OUTPUT_FIELDS if field != "secondary_images"
+) + ("secondary_images",)
+
+
+def iter_geojson(chunks):
+    yield '{"type":"FeatureCollection","features":['
+    separator = ""
+    for chunk in chunks:
+        yield separator + ",".join(
+            dump_json(GeoJSONLinesRenderer.to_feature(place)) for place in chunk
+        )
+        separator = ","
+    yield "]}"
+
+
+def iter_ndjson(chunks):
+    for chunk in chunks:
+        yield "".join(
+            dump_json(GeoJSONLinesRenderer.to_feature(place)) + "\n" for place in chunk
+        )
+
+
+def iter_csv(chunks):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_FIELDS)
+    yield out.getvalue()
+    for chunk in chunks:
+        out.seek(0)
+        out.truncate()
+        for place in chunk:
+            place["secondary_images"] = " ".join(
+                image["url"] for image in place["secondary_images"]
+            )
+            writer.writerow(place[field] for field in CSV_FIELDS)
+        yield out.getvalue()
+
+
+EXPORT_WRITERS = {"geojson": iter_geojson, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def iter_export(queryset, context, file_format):
+    """Yield the export by pieces of text."""
+    chunks = iter_place_chunks(queryset.order_by("id"), context)
+    return EXPORT_WRITERS[file_format](chunks)
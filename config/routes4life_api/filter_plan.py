@@ -0,0 +1,190 @@
+"""
+Turns validated place filters into a single queryset.
+
+Both filter endpoints and the search backend build their querysets here,
+so the radius lookup, annotations and ordering stay in one place.
+"""
+import re
+
+from django.contrib.gis.db.models import BooleanField, F, Func, Q, Value
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from rest_framework import filters
+
+from routes4life_api.geo import as_geography, filter_within_distance
+from routes4life_api.models import PlaceCategory
+
+# no stemming, names and addresses are in several languages
+SEARCH_CONFIG = "simple"
+SEARCH_WORD_RE = re.compile(r"\w+")
+# substrings of these fields are matched through their trigram indexes
+SUBSTRING_SEARCH_FIELDS = ("name", "address")
+LIKE_SPECIAL_CHARS_RE = re.compile(r"([\\%_])")
+
+
+class ILike(Func):
+    """
+    `field ILIKE pattern`. Unlike icontains lookups, which compare UPPER()
+    of the field, it can use a trigram index of the field.
+    """
+
+    arg_joiner = " ILIKE "
+    template = "%(expressions)s"
+    output_field = BooleanField()
+
+
+def contains_substring(field, substring):
+    pattern = LIKE_SPECIAL_CHARS_RE.sub(r"\\\1", substring)
+    return ILike(F(field), Value(f"%{pattern}%"))
+
+
+def get_search_query(search_terms):
+    """Prefix query of words of the terms, None if there are no words."""
+    words = [word for term in search_terms for word in SEARCH_WORD_RE.findall(term)]
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(f"{word}:*" for word in words),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+
+
+def get_search_term_filter(term):
+    """
+    Places with words starting with every word of the term, or with the term
+    in a substring search field. None if the term has no words.
+    """
+    query = get_search_query([term])
+    if query is None:
+        return None
+    term_filter = Q(search_vector=query)
+    for field in SUBSTRING_SEARCH_FIELDS:
+        term_filter |= Q(contains_substring(field, term))
+    return term_filter
+
+
+class PlaceFilterPlan:
+    orderings = {
+        "distance": ("distance", "id"),
+        "-distance": ("-distance", "-id"),
+        "rating": ("author_rating", "id"),
+        "-rating": ("-author_rating", "-id"),
+    }
+
+    def __init__(
+        self,
+        user,
+        latitude=None,
+        longitude=None,
+        distance=None,
+        categories=None,
+        rating=None,
+        ordering=None,
+        search_terms=None,
+    ):
+        self.user = user
+        self.latitude = latitude
+        self.longitude = longitude
+        self.distance = distance
+        self.categories = categories
+        self.rating = rating
+        self.ordering = ordering or None
+        self.search_terms = search_terms or []
+
+    @classmethod
+    def from_validated_data(cls, user, data, **kwargs):
+        for field in ("latitude", "longitude", "distance", "categories", "rating"):
+            kwargs.setdefault(field, data.get(field, None))
+        kwargs.setdefault("ordering", data.get("ordering", None))
+        return cls(user, **kwargs)
+
+    @property
+    def point(self):
+        return Point(self.longitude, self.latitude, srid=4326)
+
+    def filter_by_search_terms(self, queryset):
+        """
+        Match places having every term as a word prefix, using the
+        search_vector index, or inside the name or the address, using
+        trigram indexes. Unordered results are ordered by rank.
+        """
+        query = get_search_query(self.search_terms)
+        if query is None:
+            return queryset
+        for term in self.search_terms:
+            term_filter = get_search_term_filter(term)
+            if term_filter is not None:
+                queryset = queryset.filter(term_filter)
+        if self.ordering is None and not queryset.query.order_by:
+            queryset = queryset.annotate(
+                search_rank=SearchRank(F("search_vector"), query)
+            ).order_by("-search_rank", "id")
+        return queryset
+
+    def filter_queryset(self, queryset):
+        if self.distance is not None:
+            queryset = filter_within_distance(queryset, self.point, D(km=self.distance))
+        if self.categories is not None:
+            # unknown categories match no places
+            categories = map(PlaceCategory.from_label, self.categories)
+            queryset = queryset.filter(
+                category__in=[category for category in categories if category]
+            )
+        if self.rating is not None:
+            # places without a rating from their author are kept
+            queryset = queryset.filter(
+                Q(author_rating__gte=self.rating) | Q(author_rating__isnull=True)
+            )
+        queryset = self.filter_by_search_terms(queryset)
+        if self.ordering is not None:
+            if self.ordering.lstrip("-") == "distance":
+                queryset = queryset.annotate(
+                    distance=Distance(as_geography("location"), self.point)
+                )
+            queryset = queryset.order_by(*self.orderings[self.ordering])
+        return queryset
+
+    def get_queryset(self):
+        return self.filter_queryset(self.user.places.all())
+
+    def get_sql(self):
+        """SQL with params of the planned queryset, for tests and benchmarks."""
+        return self.get_queryset().query.sql_with_params()
+
+
+class PlaceSearchFilter(filters.SearchFilter):
+    """
+    Full-text search by `search` query param through PlaceFilterPlan.
+    Matched places get `search_rank` annotation if they weren't ordered.
+    """
+
+    def is_search_requested(self, request):
+        return get_search_query(self.get_search_terms(request)) is not None
+
+    def filter_queryset(self, request, queryset, view):
+        plan = PlaceFilterPlan(
+            request.user, search_terms=self.get_search_terms(request)
+        )
+        return plan.filter_queryset(queryset)
+
+
+class PlaceCategoryFilter(filters.SearchFilter):
+    """
+    Places of the category with the label passed as `search` query param,
+    the label is matched case-insensitively as `=category` search did.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        labels = {term.lower() for term in self.get_search_terms(request)}
+        if not labels:
+            return queryset
+        categories = [
+            category for category in PlaceCategory if category.label.lower() in labels
+        ]
+        # every term has to match, as with the search
+        if len(labels) > 1 or not categories:
+            return queryset.none()
+        return queryset.filter(category=categories[0])
@@ -0,0 +1,34 @@
+from django.contrib.gis.db.models import FloatField, Func, PointField, Value
+from django.contrib.gis.geos import GEOSGeometry
+from django.db.models.functions import Cast
+
+
+class X(Func):
+    """Longitude of a point."""
+
+    function = "ST_X"
+    output_field = FloatField()
+
+
+class Y(Func):
+    """Latitude of a point."""
+
+    function = "ST_Y"
+    output_field = FloatField()
+
+
+def as_geography(expression):
+    """
+    Cast a point to geography. Place.location is indexed by the same cast,
+    so lookups and <-> ordering on the result can use that index.
+    """
+    if isinstance(expression, GEOSGeometry):
+        expression = Value(expression, output_field=PointField(srid=expression.srid))
+    return Cast(expression, PointField(geography=True))
+
+
+def filter_within_distance(queryset, point, distance):
+    """Places within a distance (D) of the point, measured on the spheroid."""
+    return queryset.alias(location_geography=as_geography("location")).filter(
+        location_geography__dwithin=(point, distance)
+    )
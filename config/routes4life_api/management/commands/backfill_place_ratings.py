@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from routes4life_api.models import Place
+from routes4life_api.utils import PlaceDataVersion
+
+
+class Command(BaseCommand):
+    help = "Recalculate materialized author and average ratings of places."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Number of place ids updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_id = Place.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        updated = 0
+        for start in range(0, max_id + 1, batch_size):
+            with transaction.atomic():
+                updated += Place.objects.filter(
+                    id__gte=start, id__lt=start + batch_size
+                ).update_rating_stats()
+        PlaceDataVersion.bump_all()
+        self.stdout.write(self.style.SUCCESS(f"Updated ratings of {updated} places."))
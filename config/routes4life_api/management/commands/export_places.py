@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from routes4life_api.export import EXPORT_CONTENT_TYPES, iter_export
+from routes4life_api.models import Place, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Export places of a user, or of all users, as GeoJSON, "
+        "newline-delimited GeoJSON or CSV. Ratings are the user's ones, "
+        "or the authors' ones in exports of all users."
+    )
+
+    def add_arguments(self, parser):
+        owner = parser.add_mutually_exclusive_group(required=True)
+        owner.add_argument("--user", help="Email of the user.")
+        owner.add_argument(
+            "--all", action="store_true", help="Export places of all users."
+        )
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=list(EXPORT_CONTENT_TYPES),
+            default="geojson",
+        )
+        parser.add_argument(
+            "--output", default="-", help="Path of the file, - for stdout."
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            user, queryset = None, Place.objects.all()
+        else:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"There is no user {options['user']}.")
+            queryset = user.places.all()
+        pieces = iter_export(queryset, {"user": user}, options["file_format"])
+        if options["output"] == "-":
+            for piece in pieces:
+                self.stdout.write(piece, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as out:
+            out.writelines(pieces)
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}."))
@@ -0,0 +1,153 @@
+import csv
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.serializers import ValidationError
+
+from routes4life_api.models import Place, PlaceRating, User, bump_place_data_version
+from routes4life_api.place_import import (
+    IMPORT_FORMATS,
+    STAGING_COLUMNS,
+    CopyRowsFile,
+    clean_place_record,
+    iter_place_records,
+)
+
+STAGING_TABLE = "place_import"
+CREATE_STAGING_TABLE_SQL = f"""
+CREATE TEMPORARY TABLE {STAGING_TABLE} (
+    record integer,
+    name varchar(200),
+    description text,
+    address varchar(200),
+    category smallint,
+    longitude double precision,
+    latitude double precision,
+    rating numeric(3, 2)
+) ON COMMIT DROP
+"""
+# empty CSV fields are read as NULL, but places always have a description
+COPY_SQL = (
+    f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))"
+)
+INSERT_SQL = f"""
+WITH inserted_places AS (
+    INSERT INTO {Place._meta.db_table} (
+        added_by_id, name, description, address, category, location,
+        author_rating, average_rating, ratings_count, created_at, updated_at
+    )
+    SELECT
+        %(user_id)s, name, description, address, category,
+        ST_SetSRID(ST_MakePoint(longitude, latitude), 4326),
+        rating, rating, 1, now(), now()
+    FROM {STAGING_TABLE}
+    ORDER BY record
+    RETURNING id, author_rating
+)
+INSERT INTO {PlaceRating._meta.db_table} (
+    user_id, place_id, rating, created_at, updated_at
+)
+SELECT %(user_id)s, id, author_rating, now(), now()
+FROM inserted_places
+"""
+REJECTS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Import places from a GeoJSON, newline-delimited GeoJSON or CSV file. "
+        "CSV columns: name, description, address, category, latitude, "
+        "longitude, rating. Rows are validated like in the API, loaded with "
+        "COPY and inserted in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the file, - for stdin.")
+        parser.add_argument(
+            "--user", required=True, help="Email of the user to add places to."
+        )
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=IMPORT_FORMATS,
+            help="Format of the file, by default guessed from its extension.",
+        )
+        parser.add_argument(
+            "--rejects", help="Path of a CSV file to write rejected records to."
+        )
+
+    def get_file_format(self, path, file_format):
+        if file_format is not None:
+            return file_format
+        extension = os.path.splitext(path)[1].lstrip(".").lower()
+        extension = {"json": "geojson", "jsonl": "ndjson", "geojsonl": "ndjson"}.get(
+            extension, extension
+        )
+        if extension not in IMPORT_FORMATS:
+            raise CommandError("Can't guess the format of the file, pass --format.")
+        return extension
+
+    @staticmethod
+    def format_errors(detail):
+        if isinstance(detail, dict):
+            return "; ".join(f"{field}: {error}" for field, error in detail.items())
+        return "; ".join(map(str, detail))
+
+    def iter_rows(self, records, rejects):
+        for number, record in enumerate(records, 1):
+            if isinstance(record, ValueError):
+                rejects.append((number, f"Can't read the record: {record}"))
+                continue
+            try:
+                row = clean_place_record(record)
+            except ValidationError as exc:
+                rejects.append((number, self.format_errors(exc.detail)))
+                continue
+            yield (number, *row)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"There is no user {options['user']}.")
+        path = options["path"]
+        file_format = self.get_file_format(path, options["file_format"])
+
+        started_at = time.monotonic()
+        rejects = []
+        file = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            records = iter_place_records(file, file_format)
+            with transaction.atomic(), connection.cursor() as cursor:
+                # a table of a previous import in the same outer transaction
+                cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+                cursor.execute(CREATE_STAGING_TABLE_SQL)
+                cursor.copy_expert(
+                    COPY_SQL, CopyRowsFile(self.iter_rows(records, rejects))
+                )
+                cursor.execute(INSERT_SQL, {"user_id": user.id})
+                imported = cursor.rowcount
+                # inserts bypass signals
+                bump_place_data_version(user_ids=[user.id])
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        elapsed = time.monotonic() - started_at
+
+        for number, error in rejects[:REJECTS_SHOWN]:
+            self.stderr.write(f"Record {number} rejected: {error}")
+        if options["rejects"]:
+            with open(options["rejects"], "w", encoding="utf-8", newline="") as out:
+                writer = csv.writer(out)
+                writer.writerow(("record", "error"))
+                writer.writerows(rejects)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} places, rejected {len(rejects)} records "
+                f"in {elapsed:.1f} s ({imported / max(elapsed, 1e-6):.0f} places/s)."
+            )
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from routes4life_api.models import DeletedPlace
+from routes4life_api.sync import DELETED_PLACES_RETENTION
+
+
+class Command(BaseCommand):
+    help = "Remove deletion log entries older than sync tokens may be."
+
+    def handle(self, *args, **options):
+        deleted, _ = DeletedPlace.objects.filter(
+            deleted_at__lt=timezone.now() - DELETED_PLACES_RETENTION
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} log entries."))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from routes4life_api.place_seeding import seed_places
+from routes4life_api.utils import PlaceDataVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Create synthetic users with places clustered around cities, "
+        "for performance tests and benchmarks. Places are loaded with COPY "
+        "in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, required=True)
+        parser.add_argument("--places-per-user", type=int, required=True)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed of the generator, to repeat a dataset in another database.",
+        )
+        parser.add_argument(
+            "--password",
+            help="Password of all created users, by default they can't log in.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of users created per query.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["places_per_user"] < 0:
+            raise CommandError("Pass at least one user and no negative place count.")
+        started_at = time.monotonic()
+        try:
+            user_ids = seed_places(
+                options["users"],
+                options["places_per_user"],
+                seed=options["seed"],
+                password=options["password"],
+                batch_size=options["batch_size"],
+            )
+        except IntegrityError:
+            raise CommandError(
+                f"Users of seed {options['seed']} already exist, pass another seed."
+            )
+        # inserts bypass signals
+        PlaceDataVersion.bump_all()
+        elapsed = time.monotonic() - started_at
+        places = len(user_ids) * options["places_per_user"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(user_ids)} users and {places} places "
+                f"in {elapsed:.1f} s ({places / max(elapsed, 1e-6):.0f} places/s)."
+            )
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.3 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0017_user_is_premium'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['added_by', '-id'], name='place_added_by_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['added_by', 'name', 'id'], name='place_added_by_name_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.0.3 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0018_place_place_added_by_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='author_rating',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='average_rating',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='ratings_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['added_by', 'author_rating'], name='place_added_by_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.3 on 2026-10-18 11:48
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0019_place_author_rating_place_average_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GistIndex(django.db.models.functions.comparison.Cast(models.F('location'), django.contrib.gis.db.models.fields.PointField(geography=True)), name='place_location_geog_idx'),
+        ),
+    ]
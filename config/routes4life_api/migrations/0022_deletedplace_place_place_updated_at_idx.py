@@ -0,0 +1,25 @@
+# Generated by Django 4.0.3 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0021_place_created_at_place_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedPlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['updated_at', 'id'], name='place_updated_at_idx'),
+        ),
+    ]
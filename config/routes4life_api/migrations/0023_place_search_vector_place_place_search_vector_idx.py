@@ -0,0 +1,56 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:36
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('pg_catalog.simple', coalesce({table}.name, '')), 'A')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.category, '')), 'B')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.address, '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0022_deletedplace_place_place_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='place_search_vector_idx'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                f"""
+                CREATE FUNCTION routes4life_api_place_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector := {SEARCH_VECTOR_SQL.format(table='NEW')};
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                """
+                CREATE TRIGGER routes4life_api_place_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF name, category, address
+                ON routes4life_api_place
+                FOR EACH ROW EXECUTE FUNCTION routes4life_api_place_search_vector_update()
+                """,
+                f"""
+                UPDATE routes4life_api_place
+                SET search_vector = {SEARCH_VECTOR_SQL.format(table='routes4life_api_place')}
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER routes4life_api_place_search_vector_trigger ON routes4life_api_place",
+                "DROP FUNCTION routes4life_api_place_search_vector_update()",
+            ],
+        ),
+    ]
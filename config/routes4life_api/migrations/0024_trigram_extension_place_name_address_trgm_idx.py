@@ -0,0 +1,24 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0023_place_search_vector_place_place_search_vector_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='place_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['address'], name='place_address_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
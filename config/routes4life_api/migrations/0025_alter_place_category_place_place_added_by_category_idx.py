@@ -0,0 +1,98 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+CATEGORIES = [
+    (1, 'barsAndPubs'),
+    (2, 'hookahBars'),
+    (3, 'cafesAndRestaurants'),
+    (4, 'coffeeHouses'),
+    (5, 'pastryShopsAndBakeries'),
+    (6, 'attractions'),
+    (7, 'art'),
+    (8, 'city'),
+    (9, 'sport'),
+    (10, 'other'),
+]
+OTHER = 10
+
+# labels of categories, as searched before categories became numbers
+CATEGORY_LABEL_SQL = 'CASE {table}.category {cases} END'.format(
+    table='{table}',
+    cases=' '.join(f"WHEN {value} THEN '{label}'" for value, label in CATEGORIES),
+)
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('pg_catalog.simple', coalesce({table}.name, '')), 'A')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({category}, '')), 'B')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.address, '')), 'C')
+"""
+OLD_SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('pg_catalog.simple', coalesce({table}.name, '')), 'A')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.category, '')), 'B')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.address, '')), 'C')
+"""
+SEARCH_VECTOR_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION routes4life_api_place_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {search_vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+CREATE_TRIGGER_SQL = """
+CREATE TRIGGER routes4life_api_place_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, category, address
+ON routes4life_api_place
+FOR EACH ROW EXECUTE FUNCTION routes4life_api_place_search_vector_update()
+"""
+DROP_TRIGGER_SQL = 'DROP TRIGGER routes4life_api_place_search_vector_trigger ON routes4life_api_place'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0024_trigram_extension_place_name_address_trgm_idx'),
+    ]
+
+    operations = [
+        # the trigger depends on the column, so it can't change its type
+        migrations.RunSQL(sql=DROP_TRIGGER_SQL, reverse_sql=CREATE_TRIGGER_SQL),
+        migrations.RunSQL(
+            sql="""
+            UPDATE routes4life_api_place SET category = CASE lower(category) {} ELSE '{}' END
+            """.format(
+                ' '.join(f"WHEN '{label.lower()}' THEN '{value}'" for value, label in CATEGORIES),
+                OTHER,
+            ),
+            reverse_sql="""
+            UPDATE routes4life_api_place SET category = CASE category {} END
+            """.format(
+                ' '.join(f"WHEN '{value}' THEN '{label}'" for value, label in CATEGORIES),
+            ),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='category',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'barsAndPubs'), (2, 'hookahBars'), (3, 'cafesAndRestaurants'), (4, 'coffeeHouses'), (5, 'pastryShopsAndBakeries'), (6, 'attractions'), (7, 'art'), (8, 'city'), (9, 'sport'), (10, 'other')]),
+        ),
+        migrations.RunSQL(
+            sql=[
+                SEARCH_VECTOR_FUNCTION_SQL.format(
+                    search_vector=SEARCH_VECTOR_SQL.format(
+                        table='NEW', category=CATEGORY_LABEL_SQL.format(table='NEW')
+                    )
+                ),
+                CREATE_TRIGGER_SQL,
+            ],
+            reverse_sql=[
+                DROP_TRIGGER_SQL,
+                SEARCH_VECTOR_FUNCTION_SQL.format(
+                    search_vector=OLD_SEARCH_VECTOR_SQL.format(table='NEW')
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['added_by', 'category'], name='place_added_by_category_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.3 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0025_alter_place_category_place_place_added_by_category_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletedplace',
+            name='added_by_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='deletedplace',
+            index=models.Index(fields=['added_by_id', 'deleted_at'], name='deletedplace_added_by_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='place',
+            name='place_updated_at_idx',
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['added_by', 'updated_at', 'id'], name='place_added_by_updated_at_idx'),
+        ),
+    ]
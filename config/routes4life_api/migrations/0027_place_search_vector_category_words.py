@@ -0,0 +1,80 @@
+# Generated by Django 4.0.3 on 2026-10-18 19:24
+
+import re
+
+from django.db import migrations
+
+CATEGORIES = [
+    (1, 'barsAndPubs'),
+    (2, 'hookahBars'),
+    (3, 'cafesAndRestaurants'),
+    (4, 'coffeeHouses'),
+    (5, 'pastryShopsAndBakeries'),
+    (6, 'attractions'),
+    (7, 'art'),
+    (8, 'city'),
+    (9, 'sport'),
+    (10, 'other'),
+]
+
+
+def split_label(label):
+    return re.sub(r'([a-z])([A-Z])', r'\1 \2', label).lower()
+
+
+# words of labels are indexed separately, 'cafes and restaurants'
+# instead of a single 'cafesandrestaurants' lexeme
+CATEGORY_WORDS_SQL = 'CASE {table}.category {cases} END'.format(
+    table='{table}',
+    cases=' '.join(f"WHEN {value} THEN '{split_label(label)}'" for value, label in CATEGORIES),
+)
+CATEGORY_LABEL_SQL = 'CASE {table}.category {cases} END'.format(
+    table='{table}',
+    cases=' '.join(f"WHEN {value} THEN '{label}'" for value, label in CATEGORIES),
+)
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('pg_catalog.simple', coalesce({table}.name, '')), 'A')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({category}, '')), 'B')
+    || setweight(to_tsvector('pg_catalog.simple', coalesce({table}.address, '')), 'C')
+"""
+SEARCH_VECTOR_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION routes4life_api_place_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {search_vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+UPDATE_SEARCH_VECTOR_SQL = """
+UPDATE routes4life_api_place SET search_vector = {search_vector}
+"""
+
+
+def search_vector_sql(category_sql):
+    return [
+        SEARCH_VECTOR_FUNCTION_SQL.format(
+            search_vector=SEARCH_VECTOR_SQL.format(
+                table='NEW', category=category_sql.format(table='NEW')
+            )
+        ),
+        UPDATE_SEARCH_VECTOR_SQL.format(
+            search_vector=SEARCH_VECTOR_SQL.format(
+                table='routes4life_api_place',
+                category=category_sql.format(table='routes4life_api_place'),
+            )
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes4life_api', '0026_deletedplace_added_by_id_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=search_vector_sql(CATEGORY_WORDS_SQL),
+            reverse_sql=search_vector_sql(CATEGORY_LABEL_SQL),
+        ),
+    ]
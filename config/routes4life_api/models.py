@@ -4,11 +4,18 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.contrib.gis.db import models
+from django.contrib.gis.db.models import Avg, Count, OuterRef, Subquery
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from routes4life_api.geo import as_geography
 from routes4life_api.utils import (
+    PlaceDataVersion,
     upload_avatar_to,
     upload_place_mainimg_to,
     upload_place_secimg_to,
@@ -79,11 +86,101 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # cascading to places would send signals for every place
+            self.places.all().delete_in_bulk()
+            return super().delete(*args, **kwargs)
+
     def clean(self):
         super().clean()
         self.email = self.__class__.objects.normalize_email(self.email)
 
 
+class PlaceQuerySet(models.QuerySet):
+    def touch(self):
+        """Mark places as changed, for writes that bypass Place.save."""
+        return self.update(updated_at=timezone.now())
+
+    def delete_in_bulk(self):
+        """
+        Delete places with their images and ratings in a fixed number of
+        queries, instead of signals sent for every row by delete(). Work of
+        the post_delete receivers is done in bulk: deletions are logged,
+        data versions are bumped and files are removed after commit.
+        """
+        places = list(self.values_list("id", "added_by_id", "main_image"))
+        if not places:
+            return 0
+        place_ids = [place_id for place_id, _, _ in places]
+        images = PlaceImage.objects.filter(place_id__in=place_ids)
+        ratings = PlaceRating.objects.filter(place_id__in=place_ids)
+        main_image_field = Place._meta.get_field("main_image")
+        image_field = PlaceImage._meta.get_field("image")
+        files = [
+            *((main_image_field, main_image) for _, _, main_image in places),
+            *((image_field, image) for image in images.values_list("image", flat=True)),
+        ]
+        user_ids = {added_by_id for _, added_by_id, _ in places}
+        user_ids.update(ratings.values_list("user_id", flat=True))
+        # raw deletes send no signals, as fast deletes of delete() do
+        images._raw_delete(images.db)
+        ratings._raw_delete(ratings.db)
+        Place.objects.filter(pk__in=place_ids)._raw_delete(self.db)
+        DeletedPlace.objects.bulk_create(
+            DeletedPlace(place_id=place_id, added_by_id=added_by_id)
+            for place_id, added_by_id, _ in places
+        )
+        bump_place_data_version(user_ids=user_ids)
+
+        def remove_files():
+            for field, name in files:
+                if name:
+                    field.storage.delete(name)
+
+        transaction.on_commit(remove_files)
+        return len(places)
+
+    def update_rating_stats(self):
+        """Recalculate materialized ratings from PlaceRating rows."""
+        ratings = PlaceRating.objects.filter(place=OuterRef("pk"))
+        ratings_stats = ratings.order_by().values("place")
+        return self.update(
+            author_rating=Subquery(
+                ratings.filter(user=OuterRef("added_by"))
+                .order_by("id")
+                .values("rating")[:1]
+            ),
+            average_rating=Subquery(
+                ratings_stats.annotate(average=Avg("rating")).values("average")
+            ),
+            ratings_count=Coalesce(
+                Subquery(ratings_stats.annotate(count=Count("id")).values("count")),
+                0,
+            ),
+        )
+
+
+class PlaceCategory(models.IntegerChoices):
+    """Stored as small integers, the API uses labels of categories."""
+
+    BARS_AND_PUBS = 1, "barsAndPubs"
+    HOOKAH_BARS = 2, "hookahBars"
+    CAFES_AND_RESTAURANTS = 3, "cafesAndRestaurants"
+    COFFEE_HOUSES = 4, "coffeeHouses"
+    PASTRY_SHOPS_AND_BAKERIES = 5, "pastryShopsAndBakeries"
+    ATTRACTIONS = 6, "attractions"
+    ART = 7, "art"
+    CITY = 8, "city"
+    SPORT = 9, "sport"
+    OTHER = 10, "other"
+
+    @classmethod
+    def from_label(cls, label):
+        """Return the category with the label, or None if there is none."""
+        return next((category for category in cls if category.label == label), None)
+
+
 class Place(models.Model):
     added_by = models.ForeignKey(
         to=User, on_delete=models.CASCADE, related_name="places"
@@ -91,11 +188,54 @@ class Place(models.Model):
     name = models.CharField(max_length=200, blank=False)
     description = models.TextField(blank=True)
     address = models.CharField(max_length=200)
-    category = models.CharField(max_length=200, blank=False)
+    category = models.PositiveSmallIntegerField(choices=PlaceCategory.choices)
     location = models.PointField()
     main_image = models.ImageField(
         upload_to=upload_place_mainimg_to, blank=True, null=True
     )
+    # Materialized from PlaceRating, see PlaceQuerySet.update_rating_stats
+    author_rating = models.DecimalField(
+        max_digits=3, decimal_places=2, null=True, blank=True, editable=False
+    )
+    average_rating = models.DecimalField(
+        max_digits=3, decimal_places=2, null=True, blank=True, editable=False
+    )
+    ratings_count = models.PositiveIntegerField(default=0, editable=False)
+    # also touched on changes of the place's images and ratings
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # name, category and address, kept up to date by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PlaceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["added_by", "-id"], name="place_added_by_id_idx"),
+            models.Index(
+                fields=["added_by", "name", "id"], name="place_added_by_name_idx"
+            ),
+            models.Index(
+                fields=["added_by", "author_rating"], name="place_added_by_rating_idx"
+            ),
+            models.Index(
+                fields=["added_by", "category"], name="place_added_by_category_idx"
+            ),
+            GistIndex(as_geography("location"), name="place_location_geog_idx"),
+            models.Index(
+                fields=["added_by", "updated_at", "id"],
+                name="place_added_by_updated_at_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="place_search_vector_idx"),
+            GinIndex(
+                fields=["name"], name="place_name_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["address"],
+                name="place_address_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.name}"
@@ -106,6 +246,8 @@ class PlaceImage(models.Model):
         to=Place, on_delete=models.CASCADE, related_name="secondary_images"
     )
     image = models.ImageField(upload_to=upload_place_secimg_to, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.id}: To place {str(self.place)}"
@@ -117,11 +259,32 @@ class PlaceRating(models.Model):
         to=Place, on_delete=models.CASCADE, related_name="ratings"
     )
     rating = models.DecimalField(max_digits=3, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.id}, {self.rating}: To place {str(self.place)}"
 
 
+class DeletedPlace(models.Model):
+    """Deletion log for incremental sync, written when a place is deleted."""
+
+    # not foreign keys, the place doesn't exist anymore and its author may not
+    place_id = models.BigIntegerField()
+    added_by_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["added_by_id", "deleted_at"], name="deletedplace_added_by_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.place_id}: deleted at {self.deleted_at}"
+
+
 # SIGNAL RECEIVERS
 @receiver(models.signals.post_delete, sender=User)
 def remove_avatar_on_delete(sender, instance, using, **kwargs):
@@ -137,8 +300,54 @@ def remove_place_mainimage_on_delete(sender, instance, using, **kwargs):
     return True
 
 
+@receiver(models.signals.post_delete, sender=Place)
+def log_place_deletion(sender, instance, using, **kwargs):
+    DeletedPlace.objects.create(place_id=instance.id, added_by_id=instance.added_by_id)
+
+
 @receiver(models.signals.post_delete, sender=PlaceImage)
 def remove_place_image_on_delete(sender, instance, using, **kwargs):
     if instance.image is not None:
         instance.image.delete(save=False)
     return True
+
+
+def bump_place_data_version(user_ids=(), place_id=None):
+    """Bump data versions of users and of the place owner after commit."""
+
+    def bump():
+        owner_ids = set(user_ids)
+        if place_id is not None:
+            owner_ids.update(
+                Place.objects.filter(pk=place_id).values_list("added_by_id", flat=True)
+            )
+        for user_id in owner_ids:
+            PlaceDataVersion.bump(user_id)
+
+    transaction.on_commit(bump)
+
+
+@receiver(models.signals.post_save, sender=User)
+def bump_version_on_user_change(sender, instance, using, **kwargs):
+    # user data is a part of the homepage response
+    bump_place_data_version(user_ids=[instance.id])
+
+
+@receiver(models.signals.post_save, sender=Place)
+@receiver(models.signals.post_delete, sender=Place)
+def bump_version_on_place_change(sender, instance, using, **kwargs):
+    bump_place_data_version(user_ids=[instance.added_by_id])
+
+
+@receiver(models.signals.post_save, sender=PlaceImage)
+@receiver(models.signals.post_delete, sender=PlaceImage)
+def place_image_changed(sender, instance, using, **kwargs):
+    Place.objects.filter(pk=instance.place_id).touch()
+    bump_place_data_version(place_id=instance.place_id)
+
+
+@receiver(models.signals.post_save, sender=PlaceRating)
+@receiver(models.signals.post_delete, sender=PlaceRating)
+def place_rating_changed(sender, instance, using, **kwargs):
+    Place.objects.filter(pk=instance.place_id).touch()
+    bump_place_data_version(user_ids=[instance.user_id], place_id=instance.place_id)
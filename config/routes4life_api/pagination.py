@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PlaceCursorPagination(CursorPagination):
+    """
+    Keyset pagination for place collections, newest places first.
+    Pass `paginate=false` to get the whole collection in one response.
+    """
+
+    ordering = ("-id",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    paginate_query_param = "paginate"
+
+    def get_page_size(self, request):
+        if request.query_params.get(self.paginate_query_param) in (
+            "false",
+            "False",
+            "0",
+        ):
+            return None
+        return super().get_page_size(request)
@@ -0,0 +1,199 @@
+"""
+Streaming readers and validation for place datasets imported with
+`manage.py import_places`. Records are read one by one, so files of any
+size are imported in constant memory.
+"""
+import csv
+import io
+import json
+import math
+import re
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.serializers import ValidationError
+
+from routes4life_api.models import PlaceCategory
+from routes4life_api.validators import (
+    validate_category,
+    validate_latitude,
+    validate_longitude,
+    validate_rating,
+)
+
+IMPORT_FORMATS = ("geojson", "ndjson", "csv")
+READ_CHUNK_SIZE = 64 * 1024
+MAX_FEATURE_SIZE = 1024 * 1024
+MAX_TEXT_LENGTH = 200
+STAGING_COLUMNS = (
+    "record",
+    "name",
+    "description",
+    "address",
+    "category",
+    "longitude",
+    "latitude",
+    "rating",
+)
+WHITESPACE_RE = re.compile(r"[\s,]*")
+
+
+def iter_geojson_features(
+    file, chunk_size=READ_CHUNK_SIZE, max_feature_size=MAX_FEATURE_SIZE
+):
+    """
+    Yield features of a FeatureCollection without reading the whole file.
+    A feature that can't be decoded from `max_feature_size` characters is
+    malformed or truncated, so the rest of the file isn't buffered for it.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        start = buffer.find('"features"')
+        start = buffer.find("[", start) if start != -1 else -1
+        if start != -1:
+            break
+        chunk = file.read(chunk_size)
+        if not chunk or len(buffer) > max_feature_size:
+            raise ValueError("There is no features array in the file.")
+        buffer += chunk
+    position = start + 1
+    # characters of the file before the buffer
+    offset = 0
+    while True:
+        position = WHITESPACE_RE.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            feature, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if len(buffer) - position >= max_feature_size:
+                raise ValueError(
+                    f"Can't decode the feature at character {offset + position} "
+                    f"within {max_feature_size} characters."
+                )
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            offset += position
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield feature
+
+
+def iter_ndjson_features(file):
+    """Yield features of newline-delimited GeoJSON or a GeoJSON text sequence."""
+    for line in file:
+        line = line.strip().lstrip("\x1e")
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def feature_to_record(feature):
+    properties = feature.get("properties") or {}
+    coordinates = (feature.get("geometry") or {}).get("coordinates")
+    if not isinstance(coordinates, list) or len(coordinates) < 2:
+        coordinates = [None, None]
+    return {
+        "name": properties.get("name"),
+        "description": properties.get("description"),
+        "address": properties.get("address"),
+        "category": properties.get("category"),
+        "longitude": coordinates[0],
+        "latitude": coordinates[1],
+        "rating": properties.get("rating"),
+    }
+
+
+def iter_place_records(file, file_format):
+    """Yield place records as dicts, or errors of records that can't be read."""
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    if file_format == "geojson":
+        features = iter_geojson_features(file)
+    else:
+        features = iter_ndjson_features(file)
+    try:
+        for feature in features:
+            if isinstance(feature, ValueError):
+                yield feature
+            else:
+                yield feature_to_record(feature) if isinstance(feature, dict) else {}
+    except ValueError as exc:
+        # the rest of a broken file can't be read reliably
+        yield exc
+
+
+def clean_text(record, field, required=True, max_length=MAX_TEXT_LENGTH):
+    value = str(record.get(field) or "").strip()
+    if required and not value:
+        raise ValidationError({field: "This field is required."})
+    if max_length is not None and len(value) > max_length:
+        raise ValidationError(
+            {field: f"Ensure this field has no more than {max_length} characters."}
+        )
+    return value
+
+
+def clean_number(record, field, number_type):
+    try:
+        value = number_type(str(record.get(field)).strip())
+    except (TypeError, ValueError, InvalidOperation):
+        value = None
+    if value is None or not math.isfinite(value):
+        raise ValidationError({field: "A valid number is required."})
+    return value
+
+
+def clean_place_record(record):
+    """Return the record as a staging row, the same rules apply as in the API."""
+    category = clean_text(record, "category")
+    validate_category(category)
+    category = PlaceCategory.from_label(category).value
+    longitude = clean_number(record, "longitude", float)
+    validate_longitude(longitude)
+    latitude = clean_number(record, "latitude", float)
+    validate_latitude(latitude)
+    rating = clean_number(record, "rating", Decimal)
+    validate_rating(rating)
+    rating = rating.quantize(Decimal("0.01"))
+    return (
+        clean_text(record, "name"),
+        clean_text(record, "description", required=False, max_length=None),
+        clean_text(record, "address"),
+        category,
+        longitude,
+        latitude,
+        rating,
+    )
+
+
+class CopyRowsFile(io.TextIOBase):
+    """Read-only file of CSV lines for COPY, built from rows on demand."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.pending = ""
+        self.line = io.StringIO()
+        self.writer = csv.writer(self.line)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.pending += self.line.getvalue()
+            self.line.seek(0)
+            self.line.truncate()
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
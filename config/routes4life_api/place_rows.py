@@ -0,0 +1,131 @@
+"""
+Read-only serialization of places straight from database rows.
+
+Produces exactly the same output as GetPlaceSerializer(many=True),
+but without building model instances and serializer fields per place.
+"""
+from django.db.models import F
+
+from routes4life_api.geo import X, Y
+from routes4life_api.models import Place, PlaceCategory, PlaceImage, PlaceRating
+
+PLACE_ROW_FIELDS = (
+    "id",
+    "added_by_id",
+    "added_by__email",
+    "name",
+    "description",
+    "address",
+    "category",
+    "main_image",
+    "row_longitude",
+    "row_latitude",
+)
+
+PLACE_OUTPUT_FIELDS = (
+    "id",
+    "added_by",
+    "rating",
+    "can_edit",
+    "secondary_images",
+    "latitude",
+    "longitude",
+    "name",
+    "description",
+    "address",
+    "category",
+    "main_image",
+)
+
+
+def get_extra_fields(serializer):
+    """Fields a GetPlaceSerializer subclass declares on top of place fields."""
+    return {
+        name: field
+        for name, field in serializer.fields.items()
+        if name not in PLACE_OUTPUT_FIELDS
+    }
+
+
+def get_place_rows(queryset, extra_fields=()):
+    """Extra fields are annotations of the queryset with the same names."""
+    return queryset.annotate(
+        row_longitude=X("location"), row_latitude=Y("location")
+    ).values(*PLACE_ROW_FIELDS, *extra_fields)
+
+
+def build_file_url(storage, name, request=None):
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def serialize_place_rows(rows, context, extra_fields=None):
+    """
+    Serialize already fetched rows, loading ratings and images in bulk.
+    Without a context user, ratings are the authors' ones.
+    `extra_fields` maps names of annotations to serializer fields of them.
+    """
+    extra_fields = extra_fields or {}
+    user = context["user"]
+    request = context.get("request", None)
+    place_ids = [row["id"] for row in rows]
+
+    user_ratings = PlaceRating.objects.filter(place_id__in=place_ids)
+    if user is None:
+        # ratings of authors, for exports of all users' places
+        user_ratings = user_ratings.filter(user_id=F("place__added_by_id"))
+    else:
+        user_ratings = user_ratings.filter(user=user)
+    ratings = {}
+    for place_id, rating in user_ratings.order_by("id").values_list(
+        "place_id", "rating"
+    ):
+        ratings.setdefault(place_id, rating)
+
+    image_storage = PlaceImage._meta.get_field("image").storage
+    secondary_images = {place_id: [] for place_id in place_ids}
+    for image_id, place_id, image in (
+        PlaceImage.objects.filter(place_id__in=place_ids)
+        .order_by("id")
+        .values_list("id", "place_id", "image")
+    ):
+        secondary_images[place_id].append(
+            {"id": image_id, "url": build_file_url(image_storage, image)}
+        )
+
+    main_image_storage = Place._meta.get_field("main_image").storage
+    return [
+        {
+            "id": row["id"],
+            "added_by": row["added_by__email"],
+            "rating": ratings.get(row["id"], 0),
+            "can_edit": user is not None and row["added_by_id"] == user.id,
+            "secondary_images": secondary_images[row["id"]],
+            "latitude": row["row_latitude"],
+            "longitude": row["row_longitude"],
+            "name": row["name"],
+            "description": row["description"],
+            "address": row["address"],
+            "category": PlaceCategory(row["category"]).label,
+            "main_image": build_file_url(
+                main_image_storage, row["main_image"], request
+            ),
+            **{
+                name: field.to_representation(row[name])
+                if row[name] is not None
+                else None
+                for name, field in extra_fields.items()
+            },
+        }
+        for row in rows
+    ]
+
+
+def serialize_places(queryset, context, extra_fields=None):
+    return serialize_place_rows(
+        list(get_place_rows(queryset, extra_fields or ())), context, extra_fields
+    )
@@ -0,0 +1,237 @@
+"""
+Synthetic users and places for performance tests and benchmarks, loaded
+with `manage.py seed_places`. Places cluster around city hotspots, the
+way users save them, with a share of sparse rural points in between.
+Rows are generated lazily and streamed with COPY, so millions of places
+load in constant memory.
+"""
+import math
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from routes4life_api.models import Place, PlaceCategory, PlaceRating, User
+from routes4life_api.place_import import CopyRowsFile
+
+# name, longitude, latitude, weight of the city, spread of its places in km
+HOTSPOTS = (
+    ("Minsk", 27.5615, 53.9045, 10, 8),
+    ("Moscow", 37.6173, 55.7558, 12, 15),
+    ("Saint Petersburg", 30.3351, 59.9343, 8, 10),
+    ("Kyiv", 30.5234, 50.4501, 7, 10),
+    ("Warsaw", 21.0122, 52.2297, 7, 8),
+    ("Prague", 14.4378, 50.0755, 5, 6),
+    ("Vilnius", 25.2797, 54.6872, 4, 5),
+    ("Riga", 24.1052, 56.9496, 4, 5),
+    ("Brest", 23.6847, 52.0976, 2, 4),
+    ("Grodno", 23.8258, 53.6694, 2, 4),
+)
+# min longitude, min latitude, max longitude, max latitude of rural points
+RURAL_BOUNDS = (14.0, 49.0, 40.0, 60.5)
+RURAL_SHARE = 0.1
+# share of places a user saves in other cities than the home one
+TRAVEL_SHARE = 0.2
+KM_PER_DEGREE = 111.32
+
+# weights of categories, cafes are much more common than hookah bars
+CATEGORY_WEIGHTS = {
+    PlaceCategory.BARS_AND_PUBS: 8,
+    PlaceCategory.HOOKAH_BARS: 2,
+    PlaceCategory.CAFES_AND_RESTAURANTS: 20,
+    PlaceCategory.COFFEE_HOUSES: 12,
+    PlaceCategory.PASTRY_SHOPS_AND_BAKERIES: 6,
+    PlaceCategory.ATTRACTIONS: 10,
+    PlaceCategory.ART: 6,
+    PlaceCategory.CITY: 14,
+    PlaceCategory.SPORT: 7,
+    PlaceCategory.OTHER: 15,
+}
+CATEGORY_NOUNS = {
+    PlaceCategory.BARS_AND_PUBS: ("pub", "bar", "tavern", "brewery"),
+    PlaceCategory.HOOKAH_BARS: ("hookah lounge", "hookah bar"),
+    PlaceCategory.CAFES_AND_RESTAURANTS: ("cafe", "restaurant", "bistro", "diner"),
+    PlaceCategory.COFFEE_HOUSES: ("coffee house", "coffee bar", "roastery"),
+    PlaceCategory.PASTRY_SHOPS_AND_BAKERIES: ("bakery", "pastry shop", "patisserie"),
+    PlaceCategory.ATTRACTIONS: ("castle", "tower", "monument", "viewpoint"),
+    PlaceCategory.ART: ("gallery", "museum", "theatre", "art space"),
+    PlaceCategory.CITY: ("square", "park", "embankment", "market"),
+    PlaceCategory.SPORT: ("stadium", "gym", "pool", "skatepark"),
+    PlaceCategory.OTHER: ("shop", "library", "station", "garden"),
+}
+NAME_WORDS = (
+    "old",
+    "town",
+    "central",
+    "river",
+    "green",
+    "golden",
+    "north",
+    "sunny",
+    "quiet",
+    "royal",
+    "little",
+    "grand",
+)
+STREETS = (
+    "Lenina",
+    "Main",
+    "Park",
+    "River",
+    "Station",
+    "Garden",
+    "Market",
+    "Church",
+    "Victory",
+    "Independence",
+)
+DESCRIPTIONS = (
+    "",
+    "Worth a visit.",
+    "Great place to spend an evening with friends.",
+    "Nice view and friendly staff.",
+    "Crowded on weekends, better come early.",
+)
+SEED_COLUMNS = (
+    "added_by_id",
+    "name",
+    "description",
+    "address",
+    "category",
+    "location",
+    "author_rating",
+    "average_rating",
+    "ratings_count",
+    "created_at",
+    "updated_at",
+)
+# empty CSV fields are read as NULL, but places always have a description
+COPY_SQL = (
+    f"COPY {Place._meta.db_table} ({', '.join(SEED_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))"
+)
+# every seeded place is rated by its author only
+INSERT_RATINGS_SQL = f"""
+INSERT INTO {PlaceRating._meta.db_table} (
+    user_id, place_id, rating, created_at, updated_at
+)
+SELECT added_by_id, id, author_rating, created_at, created_at
+FROM {Place._meta.db_table}
+WHERE added_by_id = ANY(%(user_ids)s)
+"""
+
+
+def random_hotspot_point(rng, hotspot):
+    _, longitude, latitude, _, spread = hotspot
+    latitude += rng.gauss(0, spread / KM_PER_DEGREE)
+    longitude += rng.gauss(
+        0, spread / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    )
+    return longitude, latitude
+
+
+def random_rural_point(rng):
+    min_longitude, min_latitude, max_longitude, max_latitude = RURAL_BOUNDS
+    return (
+        rng.uniform(min_longitude, max_longitude),
+        rng.uniform(min_latitude, max_latitude),
+    )
+
+
+def random_rating(rng):
+    # users mostly save places they like
+    return Decimal(round(rng.triangular(0, 500, 420))) / 100
+
+
+def generate_place(rng, home):
+    """
+    A place of a user living in the `home` hotspot, as a dict of the fields
+    import_places reads.
+    """
+    category = rng.choices(
+        list(CATEGORY_WEIGHTS), weights=list(CATEGORY_WEIGHTS.values())
+    )[0]
+    if rng.random() < RURAL_SHARE:
+        longitude, latitude = random_rural_point(rng)
+        address = f"Rural road {rng.randint(1, 500)}"
+    else:
+        hotspot = home
+        if rng.random() < TRAVEL_SHARE:
+            hotspot = rng.choice(HOTSPOTS)
+        longitude, latitude = random_hotspot_point(rng, hotspot)
+        address = f"{rng.choice(STREETS)} street {rng.randint(1, 200)}, {hotspot[0]}"
+    return {
+        "name": f"{rng.choice(NAME_WORDS).capitalize()} "
+        f"{rng.choice(CATEGORY_NOUNS[category])}",
+        "description": rng.choice(DESCRIPTIONS),
+        "address": address,
+        "category": category.value,
+        "longitude": round(longitude, 6),
+        "latitude": round(latitude, 6),
+        "rating": random_rating(rng),
+    }
+
+
+def iter_place_rows(user_ids, places_per_user, rng):
+    """Yield COPY rows of places of every user, in the order of SEED_COLUMNS."""
+    created_at = timezone.now().isoformat()
+    weights = [hotspot[3] for hotspot in HOTSPOTS]
+    for user_id in user_ids:
+        home = rng.choices(HOTSPOTS, weights=weights)[0]
+        for _ in range(places_per_user):
+            place = generate_place(rng, home)
+            yield (
+                user_id,
+                place["name"],
+                place["description"],
+                place["address"],
+                place["category"],
+                f"SRID=4326;POINT({place['longitude']} {place['latitude']})",
+                place["rating"],
+                place["rating"],
+                1,
+                created_at,
+                created_at,
+            )
+
+
+def create_seed_users(count, run, password=None, batch_size=5000):
+    """
+    Create users with emails tagged by the `run` and one shared password,
+    unusable if it isn't given. Return their ids.
+    """
+    # hashing is slow by design, so the hash is shared
+    password_hash = make_password(password)
+    user_ids = []
+    for start in range(0, count, batch_size):
+        users = User.objects.bulk_create(
+            User(email=f"seed-{run}-{number}@routes4life.test", password=password_hash)
+            for number in range(start, min(start + batch_size, count))
+        )
+        user_ids.extend(user.id for user in users)
+    return user_ids
+
+
+def seed_places(users, places_per_user, seed=None, password=None, batch_size=5000):
+    """
+    Create `users` users with `places_per_user` places each in one transaction.
+    The same `seed` repeats the whole dataset, emails included, so it can be
+    loaded only once into a database. Return ids of the users.
+    """
+    rng = random.Random(seed)
+    run = f"{rng.getrandbits(32):08x}"
+    with transaction.atomic(), connection.cursor() as cursor:
+        user_ids = create_seed_users(
+            users, run, password=password, batch_size=batch_size
+        )
+        cursor.copy_expert(
+            COPY_SQL, CopyRowsFile(iter_place_rows(user_ids, places_per_user, rng))
+        )
+        cursor.execute(INSERT_RATINGS_SQL, {"user_ids": user_ids})
+    # statistics of the planner are stale after a bulk load
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {Place._meta.db_table}")
+        cursor.execute(f"ANALYZE {PlaceRating._meta.db_table}")
+    return user_ids
@@ -0,0 +1,125 @@
+from django.contrib.gis.db.models import Collect, Count, F, Q, Window
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models.functions import Greatest, RowNumber
+
+from routes4life_api.geo import X, Y
+from routes4life_api.models import Place, PlaceCategory
+
+# zoom levels from this one on get raw places instead of clusters
+CLUSTER_MAX_ZOOM = 15
+# grid cells per 256px map tile side, i.e. one cluster per 64px square
+CLUSTER_CELLS_PER_TILE = 4
+
+SUGGESTION_FIELDS = ("id", "name", "address", "category")
+
+CATEGORY_LABEL_SQL = "CASE place.category {} END".format(
+    " ".join(f"WHEN {value} THEN '{label}'" for value, label in PlaceCategory.choices)
+)
+
+TILE_EXTENT = 4096
+TILE_LAYER_NAME = "places"
+PLACE_TILE_SQL = f"""
+WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+tile_places AS (
+    SELECT
+        place.id,
+        place.name,
+        {CATEGORY_LABEL_SQL} AS category,
+        ST_AsMVTGeom(
+            ST_Transform(place.location, 3857), bounds.geom, {TILE_EXTENT}
+        ) AS geom
+    FROM {Place._meta.db_table} AS place, bounds
+    WHERE place.added_by_id = %(user_id)s
+        AND place.location && ST_Transform(bounds.geom, 4326)
+)
+SELECT ST_AsMVT(tile_places, '{TILE_LAYER_NAME}', {TILE_EXTENT}, 'geom')
+FROM tile_places
+"""
+
+
+def get_order_by_expressions(ordering):
+    return [
+        (F(field[1:]).desc() if field.startswith("-") else F(field).asc())
+        if isinstance(field, str)
+        else field
+        for field in ordering
+    ]
+
+
+def get_top_places_by_category(queryset, per_category):
+    """
+    Return at most `per_category` places of every category in one query.
+    Places are ranked within a category by the queryset ordering.
+    """
+    ordering = [*(queryset.query.order_by or ("-id",)), "id"]
+    ranked = queryset.annotate(
+        category_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F("category")],
+            order_by=get_order_by_expressions(ordering),
+        )
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    return queryset.model._default_manager.raw(
+        f"SELECT * FROM ({sql}) AS ranked_places "
+        + "WHERE category_rank <= %s ORDER BY category, category_rank",
+        (*params, per_category),
+    )
+
+
+def get_cluster_grid_size(zoom):
+    """Grid cell side in degrees for the zoom level."""
+    return 360 / (2**zoom * CLUSTER_CELLS_PER_TILE)
+
+
+def get_place_clusters(queryset, zoom):
+    """
+    Group places into grid cells and return the places count
+    and the centroid of every non-empty cell in one query.
+    """
+    return (
+        queryset.annotate(cell=SnapToGrid("location", get_cluster_grid_size(zoom)))
+        .values("cell")
+        .annotate(
+            count=Count("id"),
+            longitude=X(Centroid(Collect("location"))),
+            latitude=Y(Centroid(Collect("location"))),
+        )
+        .order_by()
+        .values_list("count", "latitude", "longitude")
+    )
+
+
+def get_place_suggestions(queryset, query, limit):
+    """
+    Return `limit` places with a name or an address most similar to the query.
+    Words of the query are matched to parts of words, so prefixes and typos
+    are found, both conditions are read from the trigram indexes.
+    """
+    suggestions = (
+        queryset.filter(
+            Q(name__trigram_word_similar=query) | Q(address__trigram_word_similar=query)
+        )
+        .annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(query, "name"),
+                TrigramWordSimilarity(query, "address"),
+            )
+        )
+        .order_by("-similarity", "id")
+        .values(*SUGGESTION_FIELDS)[:limit]
+    )
+    return [
+        {**place, "category": PlaceCategory(place["category"]).label}
+        for place in suggestions
+    ]
+
+
+def get_place_tile(user_id, z, x, y):
+    """Build a Mapbox vector tile with the user's places in one query."""
+    with connection.cursor() as cursor:
+        cursor.execute(PLACE_TILE_SQL, {"z": z, "x": x, "y": y, "user_id": user_id})
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile is not None else b""
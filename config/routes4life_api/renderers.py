@@ -0,0 +1,139 @@
+import json
+
+import msgpack
+from djangorestframework_camel_case.settings import api_settings
+from djangorestframework_camel_case.util import camelize
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+COORDINATE_PRECISION = 6
+COORDINATE_KEYS = ("latitude", "longitude")
+
+
+def is_quantize_requested(renderer_context):
+    request = (renderer_context or {}).get("request")
+    if request is None:
+        return False
+    return request.query_params.get("quantize") in ("true", "True", "1")
+
+
+def dump_json(data):
+    """Compact camel-cased JSON, as the JSON renderer would produce."""
+    return json.dumps(
+        camelize(data, **api_settings.JSON_UNDERSCOREIZE),
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def has_coordinates(data):
+    return isinstance(data, dict) and all(key in data for key in COORDINATE_KEYS)
+
+
+def quantize_coordinates(data):
+    """Round latitudes and longitudes in the data to `COORDINATE_PRECISION`."""
+    if isinstance(data, dict):
+        return {
+            key: round(value, COORDINATE_PRECISION)
+            if key in COORDINATE_KEYS and isinstance(value, float)
+            else quantize_coordinates(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [quantize_coordinates(item) for item in data]
+    return data
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if is_quantize_requested(renderer_context):
+            data = quantize_coordinates(data)
+        return msgpack.packb(
+            camelize(data, **api_settings.JSON_UNDERSCOREIZE),
+            default=JSONEncoder().default,
+        )
+
+
+class GeoJSONLinesRenderer(BaseRenderer):
+    """
+    Render places as newline-delimited GeoJSON features, one per line,
+    so clients can parse them as they arrive.
+    Responses without places, like errors, are rendered as one JSON line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    render_style = "binary"
+
+    @staticmethod
+    def get_places(data):
+        if isinstance(data, list):
+            return data
+        if "results" in data:
+            return data["results"]
+        if "places" in data:
+            return data["places"]
+        if has_coordinates(data):
+            return [data]
+        # places split by categories, or clusters
+        return [
+            item
+            for value in data.values()
+            if isinstance(value, list)
+            for item in value
+            if has_coordinates(item)
+        ]
+
+    @staticmethod
+    def to_feature(place):
+        properties = dict(place)
+        feature_id = properties.pop("id", None)
+        latitude = properties.pop("latitude")
+        longitude = properties.pop("longitude")
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+            "properties": properties,
+        }
+        if feature_id is not None:
+            feature["id"] = feature_id
+        return feature
+
+    @staticmethod
+    def to_record(data):
+        return dump_json(data).encode() + b"\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.exception:
+            return self.to_record(data)
+        if is_quantize_requested(renderer_context):
+            data = quantize_coordinates(data)
+        return b"".join(
+            self.to_record(self.to_feature(place)) for place in self.get_places(data)
+        )
+
+
+class GeoJSONSeqRenderer(GeoJSONLinesRenderer):
+    """
+    Render places as a GeoJSON text sequence (RFC 8142), every feature
+    is a record starting with RS, for clients of that format.
+    """
+
+    media_type = "application/geo+json-seq"
+    format = "geojsonseq"
+
+    @staticmethod
+    def to_record(data):
+        return b"\x1e" + dump_json(data).encode() + b"\n"
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from routes4life_api.utils import PlaceDataVersion
+
+# less than the lifetime of signed media urls in cached data
+RESPONSE_CACHE_TTL = timedelta(minutes=10)
+
+
+def get_normalized_query_string(request):
+    params = request.query_params
+    return urlencode(
+        sorted((key, value) for key in params for value in params.getlist(key))
+    )
+
+
+def get_response_cache_key(request, version):
+    query_string = get_normalized_query_string(request)
+    url = f"{request.build_absolute_uri(request.path)}?{query_string}"
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return f"places__response__{request.user.id}__{version}__{digest}"
+
+
+def cache_place_response(shared=False):
+    """
+    Cache data of successful responses of a view until the user's places change.
+    `shared` views list places of all users, so any change of places
+    makes their responses stale.
+    Keys are versioned, so nothing has to be deleted on changes.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            version = PlaceDataVersion.get(None if shared else request.user.id)
+            key = get_response_cache_key(request, version)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = view_func(request, *args, **kwargs)
+            # streaming responses are not cached
+            if isinstance(response, Response) and response.status_code == 200:
+                cache.set(
+                    key, response.data, timeout=RESPONSE_CACHE_TTL.total_seconds()
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,19 +1,37 @@
+import math
 import string
 
 import sendgrid
 from django.conf import settings
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import BaseUserManager
-from django.contrib.gis.db import models
-from django.contrib.gis.db.models import Avg, OuterRef
-from django.contrib.gis.db.models.functions import GeometryDistance
-from django.contrib.gis.geos import GEOSGeometry
-from django.contrib.gis.measure import D
+from django.contrib.gis.db.models import (
+    Manager,
+    Prefetch,
+    Q,
+    QuerySet,
+    prefetch_related_objects,
+)
+from django.contrib.gis.geos import Point, Polygon
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.serializers import ModelSerializer, Serializer, ValidationError
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 
-from routes4life_api.models import Place, PlaceImage, PlaceRating, User
+from routes4life_api.export import EXPORT_CONTENT_TYPES
+from routes4life_api.filter_plan import PlaceFilterPlan
+from routes4life_api.models import (
+    Place,
+    PlaceCategory,
+    PlaceImage,
+    PlaceRating,
+    User,
+    bump_place_data_version,
+)
+from routes4life_api.place_rows import get_extra_fields, serialize_places
+from routes4life_api.sync import read_sync_token
 from routes4life_api.utils import ResetCodeManager, SessionTokenManager
 from routes4life_api.validators import (
     validate_category,
@@ -26,6 +44,22 @@ from routes4life_api.validators import (
 )
 
 
+class CategoryField(serializers.CharField):
+    """Category of a place, stored as `PlaceCategory` and exposed by its label."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_length", 200)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        label = super().to_internal_value(data)
+        validate_category(label)
+        return PlaceCategory.from_label(label)
+
+    def to_representation(self, value):
+        return PlaceCategory(value).label
+
+
 class RegisterUserSerializer(ModelSerializer):
     confirmation_password = serializers.CharField(
         write_only=True, validators=[validate_password]
@@ -224,9 +258,116 @@ class LocationSerializer(Serializer):
     latitude = serializers.FloatField(required=True, validators=[validate_latitude])
     longitude = serializers.FloatField(required=True, validators=[validate_longitude])
     distance = serializers.FloatField(required=False, validators=[validate_distance])
+    k = serializers.IntegerField(required=False, min_value=1, max_value=100)
+
+
+class CategorySplitSerializer(Serializer):
+    per_category = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=100
+    )
+
+
+class ViewportSerializer(Serializer):
+    """
+    `bbox` is "min_lon,min_lat,max_lon,max_lat" of the visible map area.
+    A viewport crossing the antimeridian has min_lon greater than max_lon.
+    """
+
+    bbox = serializers.CharField(required=True, max_length=200)
+    zoom = serializers.IntegerField(required=True, min_value=0, max_value=22)
+
+    def validate_bbox(self, value):
+        try:
+            min_lon, min_lat, max_lon, max_lat = map(float, value.split(","))
+            # nan and inf pass range checks, as every comparison with nan is false
+            if not all(map(math.isfinite, (min_lon, min_lat, max_lon, max_lat))):
+                raise ValueError
+        except ValueError:
+            raise ValidationError(
+                "Bbox is supposed to be 4 comma-separated numbers: "
+                "min_lon,min_lat,max_lon,max_lat."
+            )
+        for longitude in (min_lon, max_lon):
+            validate_longitude(longitude)
+        for latitude in (min_lat, max_lat):
+            validate_latitude(latitude)
+        if min_lat > max_lat:
+            raise ValidationError("Min latitude can't be greater than max latitude.")
+        return min_lon, min_lat, max_lon, max_lat
+
+    def get_viewport_queryset(self, queryset):
+        min_lon, min_lat, max_lon, max_lat = self.validated_data["bbox"]
+        if min_lon <= max_lon:
+            boxes = [(min_lon, min_lat, max_lon, max_lat)]
+        else:
+            boxes = [
+                (min_lon, min_lat, 180, max_lat),
+                (-180, min_lat, max_lon, max_lat),
+            ]
+        condition = Q()
+        for box in boxes:
+            polygon = Polygon.from_bbox(box)
+            polygon.srid = 4326
+            condition |= Q(location__bboxoverlaps=polygon)
+        return queryset.filter(condition)
+
+
+class PlaceSyncSerializer(Serializer):
+    """
+    `since` is the token returned by the previous sync, `token` is the one
+    of a full sync, passed in links to its next pages.
+    """
+
+    since = serializers.CharField(required=False, max_length=200)
+    token = serializers.CharField(required=False, max_length=200)
+
+    def validate_since(self, value):
+        return read_sync_token(value, self.context["user"])
+
+    def validate_token(self, value):
+        if read_sync_token(value, self.context["user"]) is None:
+            return None
+        return value
+
+
+class PlaceAutocompleteSerializer(Serializer):
+    """Suggestions can be limited to `dist` kilometers around `lat` and `lon`."""
+
+    q = serializers.CharField(required=True, max_length=200)
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=20
+    )
+    lat = serializers.FloatField(required=False, validators=[validate_latitude])
+    lon = serializers.FloatField(required=False, validators=[validate_longitude])
+    dist = serializers.FloatField(
+        required=False, default=10, validators=[validate_distance]
+    )
+
+    def validate_q(self, value):
+        # suggestions don't depend on case and spacing, so neither do cache keys
+        return " ".join(value.lower().split())
+
+    def validate(self, data):
+        if ("lat" in data) != ("lon" in data):
+            raise ValidationError("Both lat and lon are required to limit the area.")
+        return data
+
+
+class PlaceExportSerializer(Serializer):
+    # not `format`, it is reserved for renderer negotiation
+    file_format = serializers.ChoiceField(
+        choices=list(EXPORT_CONTENT_TYPES), required=False, default="geojson"
+    )
+    all_users = serializers.BooleanField(required=False, default=False)
+
+    def validate_all_users(self, value):
+        if value and not self.context["user"].is_staff:
+            raise PermissionDenied("Only admins can export places of all users.")
+        return value
 
 
 class ClientValidatePlaceSerializer(ModelSerializer):
+    category = CategoryField()
     latitude = serializers.FloatField(validators=[validate_latitude])
     longitude = serializers.FloatField(validators=[validate_longitude])
     rating = serializers.DecimalField(3, 2, required=True, validators=[validate_rating])
@@ -239,10 +380,91 @@ class ClientValidatePlaceSerializer(ModelSerializer):
         exclude = ("location", "added_by")
         extra_kwargs = {
             "main_image": {"required": True, "allow_null": False},
-            "category": {"validators": [validate_category]},
         }
 
 
+class BulkCreatePlaceSerializer(ClientValidatePlaceSerializer):
+    class Meta(ClientValidatePlaceSerializer.Meta):
+        extra_kwargs = {
+            **ClientValidatePlaceSerializer.Meta.extra_kwargs,
+            "main_image": {"required": False, "allow_null": True},
+        }
+
+    def validate_secondary_images(self, value):
+        if len(value) > 10:
+            raise ValidationError(
+                "Total of secondary images has to be less or equal to 10!"
+            )
+        return value
+
+
+class BulkCreatePlacesSerializer(Serializer):
+    """
+    Create all places or none of them. Places and their ratings are
+    inserted with one query each, images are uploaded after the commit.
+    """
+
+    max_places = 100
+
+    places = BulkCreatePlaceSerializer(many=True, allow_empty=False)
+
+    def to_internal_value(self, data):
+        # checked before places are validated one by one
+        places = data.get("places") if isinstance(data, dict) else None
+        if isinstance(places, list) and len(places) > self.max_places:
+            raise ValidationError(
+                {"places": [f"Up to {self.max_places} places can be created at once."]}
+            )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        user = self.context["user"]
+        items = validated_data["places"]
+        places = [
+            Place(
+                added_by=user,
+                name=item["name"],
+                description=item.get("description", ""),
+                address=item["address"],
+                category=item["category"],
+                location=Point(item["longitude"], item["latitude"], srid=4326),
+                author_rating=item["rating"],
+                average_rating=item["rating"],
+                ratings_count=1,
+            )
+            for item in items
+        ]
+        with transaction.atomic():
+            Place.objects.bulk_create(places)
+            PlaceRating.objects.bulk_create(
+                PlaceRating(user=user, place=place, rating=item["rating"])
+                for place, item in zip(places, items)
+            )
+
+        # file names are built from ids, so images are saved after inserts
+        with_main_image = []
+        secondary_images = []
+        for place, item in zip(places, items):
+            if item.get("main_image") is not None:
+                image = item["main_image"]
+                place.main_image.save(image.name, image.file, save=False)
+                place.updated_at = timezone.now()
+                with_main_image.append(place)
+            secondary_images.extend(
+                (place, image) for image in item.get("secondary_images", [])
+            )
+        Place.objects.bulk_update(with_main_image, ["main_image", "updated_at"])
+        place_images = PlaceImage.objects.bulk_create(
+            PlaceImage(place=place) for place, _ in secondary_images
+        )
+        for place_image, (_, image) in zip(place_images, secondary_images):
+            place_image.image.save(image.name, image.file, save=False)
+        PlaceImage.objects.bulk_update(place_images, ["image"])
+        # bulk queries send no signals
+        bump_place_data_version(user_ids=[user.id])
+        return places
+
+
 class CreateUpdatePlaceSerializer(GeoFeatureModelSerializer):
     rating = serializers.DecimalField(3, 2, required=True)
 
@@ -258,11 +480,17 @@ class CreateUpdatePlaceSerializer(GeoFeatureModelSerializer):
         validated_data["added_by"] = self.context["user"]
         tmp_main_image = validated_data.pop("main_image")
         rating = validated_data.pop("rating")
-        instance = self.Meta.model.objects.create(**validated_data)
+        with transaction.atomic():
+            instance = self.Meta.model.objects.create(
+                author_rating=rating,
+                average_rating=rating,
+                ratings_count=1,
+                **validated_data,
+            )
+            instance.ratings.create(
+                user=self.context["user"], place=instance, rating=rating
+            )
         instance.main_image.save(tmp_main_image.name, tmp_main_image.file, True)
-        instance.ratings.create(
-            user=self.context["user"], place=instance, rating=rating
-        )
         instance.refresh_from_db()
         return instance
 
@@ -273,15 +501,47 @@ class CreateUpdatePlaceSerializer(GeoFeatureModelSerializer):
         if tmp_main_image is not None:
             instance.main_image.save(tmp_main_image.name, tmp_main_image.file, True)
         if rating is not None:
-            instance.ratings.filter(user=self.context["user"], place=instance).update(
-                rating=rating
-            )
+            with transaction.atomic():
+                instance.ratings.filter(
+                    user=self.context["user"], place=instance
+                ).update(rating=rating, updated_at=timezone.now())
+                places = Place.objects.filter(pk=instance.pk)
+                places.update_rating_stats()
+                places.touch()
+                # queryset updates don't send signals
+                bump_place_data_version(
+                    user_ids=[self.context["user"].id], place_id=instance.pk
+                )
         instance.refresh_from_db()
         return instance
 
 
+class PlaceListSerializer(serializers.ListSerializer):
+    """
+    Querysets are read as flat rows, lists of already fetched places get
+    authors, secondary images and ratings of the context user loaded
+    for the whole collection at once instead of once per place.
+    Fields declared by subclasses of GetPlaceSerializer are read from
+    queryset annotations of the same name.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, (Manager, QuerySet)):
+            return serialize_places(
+                data.all(), self.context, get_extra_fields(self.child)
+            )
+        data = list(data)
+        prefetch_related_objects(
+            data,
+            "added_by",
+            *GetPlaceSerializer.get_prefetch_lookups(self.context["user"]),
+        )
+        return super().to_representation(data)
+
+
 class GetPlaceSerializer(ModelSerializer):
     added_by = serializers.SlugRelatedField(read_only=True, slug_field="email")
+    category = CategoryField()
     rating = serializers.SerializerMethodField()
     can_edit = serializers.SerializerMethodField()
     secondary_images = serializers.SerializerMethodField()
@@ -290,17 +550,39 @@ class GetPlaceSerializer(ModelSerializer):
 
     class Meta:
         model = Place
-        exclude = ["location"]
+        exclude = [
+            "location",
+            "author_rating",
+            "average_rating",
+            "ratings_count",
+            "created_at",
+            "updated_at",
+            "search_vector",
+        ]
+        list_serializer_class = PlaceListSerializer
+
+    @staticmethod
+    def get_prefetch_lookups(user):
+        return (
+            "secondary_images",
+            Prefetch(
+                "ratings",
+                queryset=PlaceRating.objects.filter(user=user),
+                to_attr="user_ratings",
+            ),
+        )
 
     def get_rating(self, current_place):
         # NOTE: returns only rating by user who added this place
-        queryset = current_place.ratings.filter(user=self.context["user"])
-        if queryset.exists():
-            return queryset[0].rating
+        ratings = getattr(current_place, "user_ratings", None)
+        if ratings is None:
+            ratings = current_place.ratings.filter(user=self.context["user"])[:1]
+        if ratings:
+            return ratings[0].rating
         return 0
 
     def get_can_edit(self, current_place):
-        return current_place.added_by == self.context["user"]
+        return current_place.added_by_id == self.context["user"].id
 
     def get_secondary_images(self, current_place):
         return [
@@ -315,6 +597,15 @@ class GetPlaceSerializer(ModelSerializer):
         return current_place.location.coords[0]
 
 
+class KilometersField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        return value.km
+
+
+class NearestPlaceSerializer(GetPlaceSerializer):
+    distance = KilometersField()
+
+
 class UpdatePlaceImagesSerializer(Serializer):
     images_to_upload = serializers.ListField(
         child=serializers.ImageField(), required=False
@@ -377,50 +668,15 @@ class PlaceFilterSerializer(Serializer):
     categories = serializers.ListField(
         required=False, child=serializers.CharField(max_length=50)
     )
-    # NOTE complex logic, update in future
     rating = serializers.DecimalField(3, 2, required=False)
     ordering = serializers.CharField(
         required=False, max_length=50, validators=[validate_place_ordering]
     )
 
     def get_filters_applied_queryset(self):
-        data = self.validated_data
-        current_point = GEOSGeometry(
-            "POINT({} {})".format(data["longitude"], data["latitude"]), srid=4326
-        )
-        qs = self.context["user"].places.filter(location__dwithin=(current_point, 0.05))
-        filter_data = {}
-        filter_data["location__distance_lte"] = (
-            current_point,
-            D(km=data["distance"]),
-        )
-        if data.get("categories", None) is not None:
-            filter_data["category__in"] = data["categories"]
-        qs = qs.filter(**filter_data)
-
-        if data.get("rating", None) is not None:
-            place_ids_to_exclude = []
-            for place in qs:
-                ratings_from_author = place.ratings.filter(user=place.added_by)
-                if (
-                    ratings_from_author.exists()
-                    and ratings_from_author[0].rating < data["rating"]
-                ):
-                    place_ids_to_exclude.append(place.id)
-            qs = qs.exclude(id__in=place_ids_to_exclude)
-        ordering = data.get("ordering", "")
-        if "distance" in ordering:
-            qs = qs.annotate(
-                distance=GeometryDistance("location", current_point)
-            ).order_by(ordering)
-        elif "rating" in ordering:
-            rating_subquery = PlaceRating.objects.filter(
-                user=self.context["user"], place=OuterRef("pk")
-            ).values("rating")
-            qs = qs.annotate(
-                rating=Avg(rating_subquery, output_field=models.FloatField())
-            ).order_by(ordering)
-        return qs
+        return PlaceFilterPlan.from_validated_data(
+            self.context["user"], self.validated_data
+        ).get_queryset()
 
 
 class PlaceFilterNewSerializer(Serializer):
@@ -432,7 +688,6 @@ class PlaceFilterNewSerializer(Serializer):
     categories = serializers.ListField(
         required=False, child=serializers.CharField(max_length=50)
     )
-    # NOTE complex logic, update in future
     rating = serializers.DecimalField(3, 2, required=False)
     ordering = serializers.CharField(
         required=False, max_length=50, validators=[validate_place_ordering]
@@ -440,52 +695,11 @@ class PlaceFilterNewSerializer(Serializer):
 
     def get_filters_applied_queryset(self):
         data = self.validated_data
-        current_point = GEOSGeometry(
-            "POINT({} {})".format(data["longitude"], data["latitude"]), srid=4326
-        )
-        if data["apply_filters"]:
-            qs = self.context["user"].places.filter(
-                location__dwithin=(current_point, 0.05)
-            )
-        else:
-            qs = self.context["user"].places.all()
         if not data["apply_filters"]:
-            return qs
-
-        filter_data = {}
-        dist = (
-            data.get("distance", None)
-            if data.get("distance", None) is not None
-            else 5.0
-        )
-        filter_data["location__distance_lte"] = (
-            current_point,
-            D(km=dist),
-        )
-        if data.get("categories", None) is not None:
-            filter_data["category__in"] = data["categories"]
-        qs = qs.filter(**filter_data)
-
-        if data.get("rating", None) is not None:
-            place_ids_to_exclude = []
-            for place in qs:
-                ratings_from_author = place.ratings.filter(user=place.added_by)
-                if (
-                    ratings_from_author.exists()
-                    and ratings_from_author[0].rating < data["rating"]
-                ):
-                    place_ids_to_exclude.append(place.id)
-            qs = qs.exclude(id__in=place_ids_to_exclude)
-        ordering = data.get("ordering", "")
-        if "distance" in ordering:
-            qs = qs.annotate(
-                distance=GeometryDistance("location", current_point)
-            ).order_by(ordering)
-        elif "rating" in ordering:
-            rating_subquery = PlaceRating.objects.filter(
-                user=self.context["user"], place=OuterRef("pk")
-            ).values("rating")
-            qs = qs.annotate(
-                rating=Avg(rating_subquery, output_field=models.FloatField())
-            ).order_by(ordering)
-        return qs
+            return self.context["user"].places.all()
+        distance = data.get("distance", None)
+        return PlaceFilterPlan.from_validated_data(
+            self.context["user"],
+            data,
+            distance=distance if distance is not None else 5.0,
+        ).get_queryset()
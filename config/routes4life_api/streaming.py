@@ -0,0 +1,71 @@
+from django.http import StreamingHttpResponse
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+
+from routes4life_api.place_rows import get_place_rows, serialize_place_rows
+from routes4life_api.renderers import GeoJSONLinesRenderer
+
+STREAM_CHUNK_SIZE = 500
+
+
+def is_streaming_requested(request):
+    return request.query_params.get("stream") in ("true", "True", "1")
+
+
+def iter_place_chunks(
+    queryset, context, chunk_size=STREAM_CHUNK_SIZE, extra_fields=None
+):
+    """Serialize places by chunks of rows read from a server-side cursor."""
+    chunk = []
+    rows = get_place_rows(queryset, extra_fields or ())
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield serialize_place_rows(chunk, context, extra_fields)
+            chunk = []
+    if chunk:
+        yield serialize_place_rows(chunk, context, extra_fields)
+
+
+def iter_json_array(chunks):
+    """Render every chunk on its own and glue them into one JSON array."""
+    renderer = CamelCaseJSONRenderer()
+    separator = b"["
+    for chunk in chunks:
+        # strip brackets of the rendered chunk array
+        yield separator + renderer.render(chunk)[1:-1]
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def iter_geojson_features(chunks, renderer, renderer_context=None):
+    """GeoJSON lines and records are independent, so chunks are just joined."""
+    for chunk in chunks:
+        yield renderer.render(chunk, renderer_context=renderer_context)
+
+
+class StreamingPlacesResponse(StreamingHttpResponse):
+    """
+    Stream places as a JSON array,
+    or as GeoJSON feature lines or records if such a renderer was accepted.
+    `extra_fields` are serialized like in PlaceListSerializer.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        context,
+        chunk_size=STREAM_CHUNK_SIZE,
+        request=None,
+        extra_fields=None,
+        **kwargs,
+    ):
+        chunks = iter_place_chunks(queryset, context, chunk_size, extra_fields)
+        request = request or context.get("request")
+        renderer = getattr(request, "accepted_renderer", None)
+        if isinstance(renderer, GeoJSONLinesRenderer):
+            kwargs.setdefault("content_type", renderer.media_type)
+            content = iter_geojson_features(chunks, renderer, {"request": request})
+        else:
+            kwargs.setdefault("content_type", "application/json")
+            content = iter_json_array(chunks)
+        super().__init__(content, **kwargs)
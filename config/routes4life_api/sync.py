@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from django.core import signing
+from rest_framework.serializers import ValidationError
+
+from routes4life_api.models import DeletedPlace
+
+SYNC_TOKEN_SALT = "routes4life_api.sync"
+# changes are timestamped before their transaction commits,
+# so every sync also returns changes made shortly before the previous one
+SYNC_OVERLAP = timedelta(minutes=1)
+# deletion log entries older than that are pruned
+DELETED_PLACES_RETENTION = timedelta(days=30)
+
+
+def make_sync_token(user, synced_at):
+    return signing.dumps(
+        {"user": user.id, "synced_at": synced_at.isoformat()}, salt=SYNC_TOKEN_SALT
+    )
+
+
+def read_sync_token(token, user):
+    """
+    Return the time of the user's sync, or None if the token is too old
+    to continue.
+    """
+    try:
+        payload = signing.loads(
+            token, salt=SYNC_TOKEN_SALT, max_age=DELETED_PLACES_RETENTION
+        )
+    except signing.SignatureExpired:
+        return None
+    except signing.BadSignature:
+        raise ValidationError("Invalid sync token.")
+    # tokens of syncs of all places had only the time,
+    # deletions logged before weren't attributed to users
+    if not isinstance(payload, dict):
+        return None
+    if payload["user"] != user.id:
+        raise ValidationError("Invalid sync token.")
+    return datetime.fromisoformat(payload["synced_at"])
+
+
+def get_place_changes(user, since):
+    """Places of the user changed and ids of ones deleted since the time."""
+    changed_since = since - SYNC_OVERLAP
+    places = user.places.filter(updated_at__gte=changed_since).order_by("id")
+    deleted_ids = DeletedPlace.objects.filter(
+        added_by_id=user.id, deleted_at__gte=changed_since
+    ).values_list("place_id", flat=True)
+    return places, list(deleted_ids)
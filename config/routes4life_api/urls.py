@@ -7,11 +7,16 @@ from routes4life_api.views import (
     ForgotPasswordViewSet,
     GetPlacesByOneCategoryAPIView,
     NearestPlacesAPIView,
+    PlaceAutocompleteAPIView,
+    PlaceExportAPIView,
+    PlaceSyncAPIView,
+    PlaceTileAPIView,
     PlaceViewSet,
     RegisterAPIView,
     SearchPlacesAPIView,
     UpdatePlaceSecondaryImagesAPIView,
     UserInfoViewSet,
+    ViewportPlacesAPIView,
     change_my_email,
     change_my_password,
     homepage,
@@ -65,6 +70,13 @@ urlpatterns = [
         ),
         name="places_update_delete",
     ),
+    path(
+        "places/bulk/",
+        PlaceViewSet.as_view({"post": "bulk_create_places"}),
+        name="places_bulk_create",
+    ),
+    path("places/export/", PlaceExportAPIView.as_view(), name="places_export"),
+    path("places/sync/", PlaceSyncAPIView.as_view(), name="places_sync"),
     path(
         "places/<int:pk>/images/",
         UpdatePlaceSecondaryImagesAPIView.as_view(),
@@ -75,7 +87,18 @@ urlpatterns = [
         NearestPlacesAPIView.as_view(),
         name="nearest_places",
     ),
+    path("places/viewport/", ViewportPlacesAPIView.as_view(), name="viewport_places"),
+    path(
+        "places/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        PlaceTileAPIView.as_view(),
+        name="place_tiles",
+    ),
     path("places/search/", SearchPlacesAPIView.as_view(), name="search_places"),
+    path(
+        "places/autocomplete/",
+        PlaceAutocompleteAPIView.as_view(),
+        name="autocomplete_places",
+    ),
     path("places/filter/", FilterPlacesAPIView.as_view(), name="filter_places"),
     path(
         "places/new_filter/", FilterPlacesNewAPIView.as_view(), name="filter_places_new"
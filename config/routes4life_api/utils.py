@@ -1,6 +1,7 @@
 import os
 import random
 import string
+import time
 from datetime import timedelta
 
 from django.conf import settings
@@ -52,6 +53,48 @@ class SessionTokenManager:
         return True
 
 
+class PlaceDataVersion:
+    """
+    Versions of places data to build cache keys on.
+    Every change of a user's places bumps the user's version and the version
+    of all places, `bump_all` is for bulk changes that bypass signals.
+    """
+
+    __epoch_key = "places__version__epoch"
+    __all_key = "places__version__all"
+
+    @staticmethod
+    def __user_key(user_id) -> str:
+        return f"places__version__{user_id}"
+
+    @classmethod
+    def get(cls, user_id=None) -> str:
+        key = cls.__all_key if user_id is None else cls.__user_key(user_id)
+        versions = cache.get_many([cls.__epoch_key, key])
+        for missing_key in {cls.__epoch_key, key} - versions.keys():
+            # versions start from the current time, so a version lost by
+            # cache eviction can't match keys cached before
+            cache.add(missing_key, time.time_ns(), timeout=None)
+            versions[missing_key] = cache.get(missing_key)
+        return f"{versions[cls.__epoch_key]}.{versions[key]}"
+
+    @classmethod
+    def __incr(cls, key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+    @classmethod
+    def bump(cls, user_id):
+        cls.__incr(cls.__user_key(user_id))
+        cls.__incr(cls.__all_key)
+
+    @classmethod
+    def bump_all(cls):
+        cls.__incr(cls.__epoch_key)
+
+
 def convert_placedata_to_geojson(data):
     transformed_data = {}
     if data.get("latitude") is not None and data.get("longitude") is not None:
@@ -2,6 +2,8 @@ import re
 
 from rest_framework.serializers import ValidationError
 
+from routes4life_api.models import PlaceCategory
+
 
 def validate_latitude(value):
     if value < -90 or value > 90:
@@ -35,19 +37,7 @@ def validate_place_ordering(value):
 
 
 def validate_category(value):
-    allowed_categories = [
-        "barsAndPubs",
-        "hookahBars",
-        "cafesAndRestaurants",
-        "coffeeHouses",
-        "pastryShopsAndBakeries",
-        "attractions",
-        "art",
-        "city",
-        "sport",
-        "other",
-    ]
-    if value not in allowed_categories:
+    if PlaceCategory.from_label(value) is None:
         raise ValidationError({"category": "Unallowed category."})
 
 
@@ -1,24 +1,59 @@
+import hashlib
+import json
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.contrib.gis.db.models import Count
-from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from djangorestframework_camel_case.settings import api_settings as camel_case_settings
+from djangorestframework_camel_case.util import underscoreize
 from rest_framework import filters, viewsets
 from rest_framework.decorators import (
     action,
     api_view,
     authentication_classes,
     permission_classes,
+    renderer_classes,
 )
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import CreateAPIView, GenericAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
+from routes4life_api.conditional import place_condition
+from routes4life_api.export import EXPORT_CONTENT_TYPES, iter_export
+from routes4life_api.filter_plan import (
+    PlaceCategoryFilter,
+    PlaceFilterPlan,
+    PlaceSearchFilter,
+)
+from routes4life_api.geo import as_geography, filter_within_distance
 from routes4life_api.models import Place
+from routes4life_api.pagination import PlaceCursorPagination
 from routes4life_api.permissions import IsSameUserOrReadonly
+from routes4life_api.place_rows import get_extra_fields
+from routes4life_api.queries import (
+    CLUSTER_MAX_ZOOM,
+    get_place_clusters,
+    get_place_suggestions,
+    get_place_tile,
+    get_top_places_by_category,
+)
+from routes4life_api.renderers import GeoJSONLinesRenderer, GeoJSONSeqRenderer
+from routes4life_api.response_cache import cache_place_response
 from routes4life_api.serializers import (
+    BulkCreatePlacesSerializer,
+    CategorySplitSerializer,
     ChangePasswordForgotSerializer,
     ChangePasswordSerializer,
     ClientValidatePlaceSerializer,
@@ -27,17 +62,62 @@ from routes4life_api.serializers import (
     FindEmailSerializer,
     GetPlaceSerializer,
     LocationSerializer,
+    NearestPlaceSerializer,
+    PlaceAutocompleteSerializer,
+    PlaceExportSerializer,
     PlaceFilterNewSerializer,
     PlaceFilterSerializer,
+    PlaceSyncSerializer,
     RegisterUserSerializer,
     UpdateEmailSerializer,
     UpdatePlaceImagesSerializer,
     UserInfoSerializer,
+    ViewportSerializer,
 )
-from routes4life_api.utils import convert_placedata_to_geojson
+from routes4life_api.streaming import StreamingPlacesResponse, is_streaming_requested
+from routes4life_api.sync import get_place_changes, make_sync_token
+from routes4life_api.utils import PlaceDataVersion, convert_placedata_to_geojson
 
 User = get_user_model()
 
+PLACE_RENDERER_CLASSES = [
+    *api_settings.DEFAULT_RENDERER_CLASSES,
+    GeoJSONLinesRenderer,
+    GeoJSONSeqRenderer,
+]
+MAX_TILE_ZOOM = 22
+TILE_CACHE_TTL = timedelta(days=1)
+# suggestions have no media urls that could expire
+AUTOCOMPLETE_CACHE_TTL = timedelta(hours=1)
+
+
+def split_places_by_categories(request, queryset):
+    split_serializer = CategorySplitSerializer(data=request.query_params)
+    split_serializer.is_valid(raise_exception=True)
+    places = get_top_places_by_category(
+        queryset, split_serializer.validated_data["per_category"]
+    )
+    data_split_by_categories = {}
+    serializer = GetPlaceSerializer(places, many=True, context={"user": request.user})
+    for place in serializer.data:
+        data_split_by_categories.setdefault(place["category"], []).append(place)
+    return data_split_by_categories
+
+
+class StreamingPlacesMixin:
+    """Stream the whole filtered collection if `stream=true` was passed."""
+
+    def list(self, request, *args, **kwargs):
+        if is_streaming_requested(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            return StreamingPlacesResponse(
+                queryset,
+                self.get_serializer_context(),
+                # like distance of nearest places
+                extra_fields=get_extra_fields(self.get_serializer()),
+            )
+        return super().list(request, *args, **kwargs)
+
 
 class RegisterAPIView(CreateAPIView):
     queryset = User.objects.all()
@@ -158,19 +238,35 @@ class ForgotPasswordViewSet(viewsets.GenericViewSet):
 @api_view(["GET"])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
+@renderer_classes(PLACE_RENDERER_CLASSES)
+@place_condition(with_user=True)
+@cache_place_response()
 def homepage(request):
-    places = GetPlaceSerializer(
-        request.user.places.all(), context={"user": request.user}, many=True
-    ).data
     user_data = UserInfoSerializer(request.user).data
-    return Response({**user_data, "places": places})
+    paginator = PlaceCursorPagination()
+    places = request.user.places.all()
+    page = paginator.paginate_queryset(places, request)
+    if page is not None:
+        places = GetPlaceSerializer(page, context={"user": request.user}, many=True)
+        return Response(
+            {
+                **user_data,
+                "places": places.data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            }
+        )
+    places = GetPlaceSerializer(places, context={"user": request.user}, many=True)
+    return Response({**user_data, "places": places.data})
 
 
 class PlaceViewSet(viewsets.GenericViewSet):
     queryset = Place.objects.all()
+    renderer_classes = PLACE_RENDERER_CLASSES
+    pagination_class = PlaceCursorPagination
 
     def get_permissions(self):
-        if self.action in ("get_places", "create_place"):
+        if self.action in ("get_places", "create_place", "bulk_create_places"):
             permission_classes = [IsAuthenticated]
         else:
             permission_classes = [IsSameUserOrReadonly]
@@ -182,9 +278,22 @@ class PlaceViewSet(viewsets.GenericViewSet):
         return obj
 
     @action(detail=False, methods=["get"])
+    @method_decorator(place_condition(shared=True))
+    @method_decorator(cache_place_response(shared=True))
     def get_places(self, request):
+        queryset = self.get_queryset()
+        if is_streaming_requested(request):
+            return StreamingPlacesResponse(
+                queryset, {"user": request.user}, request=request
+            )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = GetPlaceSerializer(
+                page, many=True, context={"user": request.user}
+            )
+            return self.get_paginated_response(serializer.data)
         serializer = GetPlaceSerializer(
-            self.get_queryset(), many=True, context={"user": request.user}
+            queryset, many=True, context={"user": request.user}
         )
         return Response(serializer.data, 200)
 
@@ -217,6 +326,46 @@ class PlaceViewSet(viewsets.GenericViewSet):
         response_serializer = GetPlaceSerializer(place, context={"user": request.user})
         return Response(response_serializer.data, 201)
 
+    @action(detail=False, methods=["post"])
+    def bulk_create_places(self, request):
+        """
+        Accept `places` as a JSON list, a bare JSON list of places, or `places`
+        as a JSON string in multipart requests with images sent as
+        `main_image.<index>` and `secondary_images.<index>` files.
+        """
+        data = request.data
+        if isinstance(data, list):
+            data = {"places": data}
+        if not isinstance(data, dict):
+            raise ParseError("Places are supposed to be a JSON list.")
+        if isinstance(data.get("places"), str):
+            try:
+                places = json.loads(data["places"])
+            except ValueError as exc:
+                raise ParseError(f"Places JSON parse error - {exc}")
+            if not isinstance(places, list):
+                raise ParseError("Places are supposed to be a JSON list.")
+            places = underscoreize(places, **camel_case_settings.JSON_UNDERSCOREIZE)
+            for index, place in enumerate(places):
+                if not isinstance(place, dict):
+                    continue
+                place["main_image"] = request.FILES.get(f"main_image.{index}")
+                secondary_images = request.FILES.getlist(f"secondary_images.{index}")
+                if secondary_images:
+                    place["secondary_images"] = secondary_images
+            data = {"places": places}
+        serializer = BulkCreatePlacesSerializer(
+            data=data, context={"user": request.user}
+        )
+        serializer.is_valid(raise_exception=True)
+        places = serializer.save()
+        response_serializer = GetPlaceSerializer(
+            Place.objects.filter(pk__in=[place.pk for place in places]).order_by("id"),
+            many=True,
+            context={"user": request.user},
+        )
+        return Response({"places": response_serializer.data}, 201)
+
     @action(detail=True, methods=["patch"], permission_classes=[IsSameUserOrReadonly])
     def update_place(self, request, pk=None):
         place = self.get_object()
@@ -242,6 +391,76 @@ class PlaceViewSet(viewsets.GenericViewSet):
         return Response({"success": "Place successfully removed."}, 204)
 
 
+class PlaceSyncAPIView(GenericAPIView):
+    """
+    Return the user's places changed and ids of ones deleted since the sync
+    the `since` token was returned by, and a token for the next sync.
+    Without a token, or with an expired one, all places are returned
+    page by page and `full` is true. Every page of a full sync returns
+    the token of its first one, so changes made while paging aren't missed.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = PlaceCursorPagination
+
+    def get(self, request, *args, **kwargs):
+        serializer = PlaceSyncSerializer(
+            data=request.query_params, context={"user": request.user}
+        )
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data.get("since")
+        token = serializer.validated_data.get("token") or make_sync_token(
+            request.user, timezone.now()
+        )
+        next_link = None
+        if since is None:
+            places, deleted_ids = request.user.places.all(), []
+            page = self.paginate_queryset(places)
+            if page is not None:
+                places = page
+                next_link = self.paginator.get_next_link()
+                if next_link is not None:
+                    next_link = replace_query_param(next_link, "token", token)
+        else:
+            places, deleted_ids = get_place_changes(request.user, since)
+        places = GetPlaceSerializer(places, many=True, context={"user": request.user})
+        return Response(
+            {
+                "full": since is None,
+                "places": places.data,
+                "deleted": deleted_ids,
+                "token": token,
+                "next": next_link,
+            }
+        )
+
+
+class PlaceExportAPIView(GenericAPIView):
+    """
+    Stream the user's places, or places of all users for admins,
+    as a GeoJSON feature collection, newline-delimited GeoJSON or CSV.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = PlaceExportSerializer(
+            data=request.query_params, context={"user": request.user}
+        )
+        serializer.is_valid(raise_exception=True)
+        file_format = serializer.validated_data["file_format"]
+        if serializer.validated_data["all_users"]:
+            queryset = Place.objects.all()
+        else:
+            queryset = request.user.places.all()
+        response = StreamingHttpResponse(
+            iter_export(queryset, {"user": request.user}, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="places.{file_format}"'
+        return response
+
+
 class UpdatePlaceSecondaryImagesAPIView(GenericAPIView):
     serializer_class = UpdatePlaceImagesSerializer
     queryset = Place.objects.all()
@@ -262,10 +481,23 @@ class UpdatePlaceSecondaryImagesAPIView(GenericAPIView):
         return Response(response_serializer.data, 200)
 
 
-class NearestPlacesAPIView(ListAPIView):
+@method_decorator(place_condition(), name="list")
+class NearestPlacesAPIView(StreamingPlacesMixin, ListAPIView):
+    """
+    Return places within `dist` kilometers around the point.
+    If `k` was passed, return `k` nearest places ordered by distance
+    and `dist` becomes an optional max radius.
+    """
+
     serializer_class = GetPlaceSerializer
+    renderer_classes = PLACE_RENDERER_CLASSES
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        if "k" in self.request.query_params:
+            return NearestPlaceSerializer
+        return GetPlaceSerializer
+
     def get_serializer_context(self):
         return {
             "request": self.request,
@@ -275,26 +507,147 @@ class NearestPlacesAPIView(ListAPIView):
         }
 
     def get_queryset(self):
-        lon = self.request.query_params.get("lon")
-        lat = self.request.query_params.get("lat")
-        dist = self.request.query_params.get("dist", 10)
-        validation_serializer = LocationSerializer(
-            data={"longitude": lon, "latitude": lat, "distance": dist}
-        )
+        query_params = self.request.query_params
+        location_data = {
+            "longitude": query_params.get("lon"),
+            "latitude": query_params.get("lat"),
+        }
+        if "dist" in query_params:
+            location_data["distance"] = query_params["dist"]
+        if "k" in query_params:
+            location_data["k"] = query_params["k"]
+        validation_serializer = LocationSerializer(data=location_data)
         validation_serializer.is_valid(raise_exception=True)
-        current_point = GEOSGeometry("POINT({} {})".format(lon, lat), srid=4326)
-        return self.request.user.places.filter(
-            location__dwithin=(current_point, 0.1)
-        ).filter(location__distance_lte=(current_point, D(km=dist)))
+        data = validation_serializer.validated_data
+        current_point = Point(data["longitude"], data["latitude"], srid=4326)
+
+        if "k" not in data:
+            return filter_within_distance(
+                self.request.user.places.all(),
+                current_point,
+                D(km=data.get("distance", 10)),
+            )
+
+        queryset = self.request.user.places.all()
+        if "distance" in data:
+            plan = PlaceFilterPlan.from_validated_data(self.request.user, data)
+            queryset = plan.filter_queryset(queryset)
+        return (
+            queryset.annotate(
+                distance=Distance(as_geography("location"), current_point)
+            )
+            # <-> operator, so nearest places are read from the location index
+            .order_by(
+                GeometryDistance(as_geography("location"), as_geography(current_point)),
+                "id",
+            )[: data["k"]]
+        )
+
+
+@method_decorator(place_condition(), name="get")
+class ViewportPlacesAPIView(GenericAPIView):
+    """
+    Return places inside the visible map area.
+    Below `CLUSTER_MAX_ZOOM` places are grouped into grid cells
+    and only cells' centroids and places counts are returned.
+    """
+
+    renderer_classes = PLACE_RENDERER_CLASSES
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = ViewportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        zoom = serializer.validated_data["zoom"]
+        queryset = serializer.get_viewport_queryset(request.user.places.all())
+
+        if zoom >= CLUSTER_MAX_ZOOM:
+            places = GetPlaceSerializer(
+                queryset, many=True, context={"user": request.user}
+            )
+            return Response({"zoom": zoom, "places": places.data})
+        clusters = [
+            {"count": count, "latitude": latitude, "longitude": longitude}
+            for count, latitude, longitude in get_place_clusters(queryset, zoom)
+        ]
+        return Response({"zoom": zoom, "clusters": clusters})
+
+
+class PlaceTileAPIView(GenericAPIView):
+    """
+    Return a Mapbox vector tile with id, name and category of the user's places.
+    Tiles are cached until the user's places change.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # tiles are returned as is, negotiation only picks a renderer for errors
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, z, x, y):
+        if z > MAX_TILE_ZOOM or x >= 2**z or y >= 2**z:
+            raise Http404
+        user_id = request.user.id
+        version = PlaceDataVersion.get(user_id)
+        key = f"places__tile__{user_id}__{version}__{z}__{x}__{y}"
+        tile = cache.get(key)
+        if tile is None:
+            tile = get_place_tile(user_id, z, x, y)
+            cache.set(key, tile, timeout=TILE_CACHE_TTL.total_seconds())
+        return HttpResponse(tile, content_type="application/vnd.mapbox-vector-tile")
 
 
-class SearchPlacesAPIView(ListAPIView):
+class PlaceAutocompleteAPIView(GenericAPIView):
+    """
+    Return names and addresses of the user's places most similar to `q`,
+    tolerating typos. Suggestions are cached per query
+    until the user's places change.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = PlaceAutocompleteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        user_id = request.user.id
+        version = PlaceDataVersion.get(user_id)
+        params = "__".join(
+            str(data.get(field)) for field in ("limit", "lat", "lon", "dist")
+        )
+        digest = hashlib.sha1(f"{data['q']}__{params}".encode()).hexdigest()
+        key = f"places__autocomplete__{user_id}__{version}__{digest}"
+        suggestions = cache.get(key)
+        if suggestions is None:
+            queryset = request.user.places.all()
+            if "lat" in data:
+                queryset = filter_within_distance(
+                    queryset,
+                    Point(data["lon"], data["lat"], srid=4326),
+                    D(km=data["dist"]),
+                )
+            suggestions = get_place_suggestions(queryset, data["q"], data["limit"])
+            cache.set(key, suggestions, timeout=AUTOCOMPLETE_CACHE_TTL.total_seconds())
+        return Response({"suggestions": suggestions})
+
+
+@method_decorator(place_condition(), name="list")
+@method_decorator(cache_place_response(), name="list")
+class SearchPlacesAPIView(StreamingPlacesMixin, ListAPIView):
     serializer_class = GetPlaceSerializer
+    renderer_classes = PLACE_RENDERER_CLASSES
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["name", "category", "address"]
+    pagination_class = PlaceCursorPagination
+    filter_backends = [PlaceSearchFilter, filters.OrderingFilter]
     ordering_fields = ["name", "address"]
-    ordering = ["name"]
+
+    @property
+    def ordering(self):
+        # default ordering of found places is by rank
+        if PlaceSearchFilter().is_search_requested(self.request):
+            return ["-search_rank", "id"]
+        return ["name", "id"]
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -309,10 +662,11 @@ class FilterPlacesAPIView(GenericAPIView):
     """
     If filters were applied, return list.
     If filters were not applied, return split by categories lists.
+    Size of every list is set by `per_category` query param.
     """
 
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["name", "category", "address"]
+    filter_backends = [PlaceSearchFilter]
+    renderer_classes = PLACE_RENDERER_CLASSES
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -329,7 +683,9 @@ class FilterPlacesAPIView(GenericAPIView):
             # Pagination
             page = self.paginate_queryset(qs)
             if page is not None:
-                serializer = GetPlaceSerializer(page, many=True)
+                serializer = GetPlaceSerializer(
+                    page, many=True, context={"user": request.user}
+                )
                 return self.get_paginated_response(serializer.data)
             serializer = GetPlaceSerializer(
                 qs, many=True, context={"user": request.user}
@@ -338,23 +694,9 @@ class FilterPlacesAPIView(GenericAPIView):
                 {"filters_applied": filters_applied, "places": serializer.data}
             )
 
-        categories = request.user.places.values("category").annotate(Count("category"))
-        categories = dict(
-            (
-                (
-                    item["category"],
-                    request.user.places.filter(category=item["category"])[:10],
-                )
-                for item in categories
-                if item["category__count"]
-            )
+        data_split_by_categories = split_places_by_categories(
+            request, request.user.places.all()
         )
-        data_split_by_categories = {}
-        for k, qs in categories.items():
-            serializer = GetPlaceSerializer(
-                qs, many=True, context={"user": request.user}
-            )
-            data_split_by_categories[k] = serializer.data
         return Response(
             {"filters_applied": filters_applied, **data_split_by_categories}
         )
@@ -365,10 +707,11 @@ class FilterPlacesNewAPIView(GenericAPIView):
     If filters were applied, return list.
     If filters were not applied, return split by categories lists.
     But here we do it manually by passing additional param.
+    Size of every list is set by `per_category` query param.
     """
 
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["name", "category", "address"]
+    filter_backends = [PlaceSearchFilter]
+    renderer_classes = PLACE_RENDERER_CLASSES
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -387,7 +730,9 @@ class FilterPlacesNewAPIView(GenericAPIView):
             # Pagination
             page = self.paginate_queryset(qs)
             if page is not None:
-                serializer = GetPlaceSerializer(page, many=True)
+                serializer = GetPlaceSerializer(
+                    page, many=True, context={"user": request.user}
+                )
                 return self.get_paginated_response(serializer.data)
             serializer = GetPlaceSerializer(
                 qs, many=True, context={"user": request.user}
@@ -400,23 +745,7 @@ class FilterPlacesNewAPIView(GenericAPIView):
                 }
             )
 
-        categories = qs.values("category").annotate(Count("category"))
-        categories = dict(
-            (
-                (
-                    item["category"],
-                    qs.filter(category=item["category"])[:10],
-                )
-                for item in categories
-                if item["category__count"]
-            )
-        )
-        data_split_by_categories = {}
-        for k, qs in categories.items():
-            serializer = GetPlaceSerializer(
-                qs, many=True, context={"user": request.user}
-            )
-            data_split_by_categories[k] = serializer.data
+        data_split_by_categories = split_places_by_categories(request, qs)
         return Response(
             {
                 "filters_applied": filters_applied,
@@ -426,11 +755,14 @@ class FilterPlacesNewAPIView(GenericAPIView):
         )
 
 
-class GetPlacesByOneCategoryAPIView(ListAPIView):
+@method_decorator(place_condition(), name="list")
+@method_decorator(cache_place_response(), name="list")
+class GetPlacesByOneCategoryAPIView(StreamingPlacesMixin, ListAPIView):
     serializer_class = GetPlaceSerializer
+    renderer_classes = PLACE_RENDERER_CLASSES
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["=category"]
+    pagination_class = PlaceCursorPagination
+    filter_backends = [PlaceCategoryFilter]
 
     def get_queryset(self):
         return self.request.user.places.all()
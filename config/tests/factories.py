@@ -1,28 +1,101 @@
 import random
 import string
+from decimal import Decimal
 
 import factory
+from django.contrib.gis.geos import Point
+from factory import fuzzy
 from faker import Faker
 from pytest_factoryboy import register
-from routes4life_api.models import User
+from routes4life_api.models import Place, PlaceCategory, PlaceImage, PlaceRating, User
 
 fake = Faker()
 
 
+def fake_rating():
+    return Decimal(random.randint(0, 500)) / 100
+
+
+def fake_location():
+    return Point(float(fake.longitude()), float(fake.latitude()), srid=4326)
+
+
 @register
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = User
 
-    email = fake.email()
-    first_name = fake.first_name()
-    last_name = fake.last_name()
-    phone_number = fake.msisdn()
-    is_staff = "False"
-    is_superuser = "False"
+    email = factory.Sequence(lambda number: f"user{number}@factory.routes4life.test")
+    first_name = factory.Faker("first_name")
+    last_name = factory.Faker("last_name")
+    phone_number = factory.Faker("msisdn")
+    is_staff = False
+    is_superuser = False
+
+
+class PlaceFactory(factory.django.DjangoModelFactory):
+    """A place rated by its author, as the API creates them."""
+
+    class Meta:
+        model = Place
+
+    added_by = factory.SubFactory(UserFactory)
+    name = factory.Faker("company")
+    description = factory.Faker("sentence")
+    address = factory.Faker("address")
+    category = fuzzy.FuzzyChoice(PlaceCategory.values)
+    location = factory.LazyFunction(fake_location)
+    author_rating = factory.LazyFunction(fake_rating)
+    average_rating = factory.SelfAttribute("author_rating")
+    ratings_count = 1
+    author_place_rating = factory.RelatedFactory(
+        "tests.factories.PlaceRatingFactory",
+        factory_related_name="place",
+        user=factory.SelfAttribute("..added_by"),
+        rating=factory.SelfAttribute("..author_rating"),
+    )
+
+    @classmethod
+    def _after_postgeneration(cls, instance, create, results=None):
+        # the author's rating is a separate row, the place needs no saving again
+        pass
+
+
+class PlaceImageFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PlaceImage
+
+    place = factory.SubFactory(PlaceFactory)
+    # not uploaded, only the name is stored
+    image = factory.Sequence(lambda number: f"test/secondary_{number}.png")
+
+
+class PlaceRatingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PlaceRating
+
+    user = factory.SubFactory(UserFactory)
+    place = factory.SubFactory(PlaceFactory)
+    rating = factory.LazyFunction(fake_rating)
+
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        place_rating = super()._create(model_class, *args, **kwargs)
+        # ratings of places are materialized, as views do after rating
+        Place.objects.filter(pk=place_rating.place_id).update_rating_stats()
+        return place_rating
 
 
 def fake_password():
     return "pA$$wd" + "".join(
         random.choices(string.digits + string.ascii_letters, k=20)
     )
+
+
+def create_place(user, rating=None, **kwargs):
+    if rating is not None:
+        kwargs.update(author_rating=rating, average_rating=rating)
+    kwargs.setdefault("category", PlaceCategory.OTHER)
+    place = PlaceFactory.create(added_by=user, **kwargs)
+    place.refresh_from_db()
+    return place
@@ -0,0 +1,87 @@
+import pytest
+from django.contrib.gis.geos import Point
+from routes4life_api.filter_plan import PlaceFilterPlan
+from routes4life_api.models import PlaceCategory
+
+from tests.factories import create_place
+
+
+@pytest.mark.django_db
+def test_filter_plan_radius_at_high_latitude(user_factory):
+    user = user_factory.create()
+    # ~10 km east and ~10 km north of the center at latitude 70
+    east_place = create_place(user, location=Point(20.2627, 70.0, srid=4326))
+    north_place = create_place(user, location=Point(20.0, 70.0898, srid=4326))
+    create_place(user, location=Point(20.6, 70.0, srid=4326))
+
+    plan = PlaceFilterPlan(user, latitude=70.0, longitude=20.0, distance=11)
+    assert set(plan.get_queryset().values_list("id", flat=True)) == {
+        east_place.id,
+        north_place.id,
+    }
+    plan = PlaceFilterPlan(user, latitude=70.0, longitude=20.0, distance=9)
+    assert not plan.get_queryset().exists()
+
+
+@pytest.mark.django_db
+def test_filter_plan_distance_ordering(user_factory):
+    user = user_factory.create()
+    far_place = create_place(user, location=Point(27.6, 53.9, srid=4326))
+    near_place = create_place(user, location=Point(27.57, 53.9, srid=4326))
+
+    plan = PlaceFilterPlan(
+        user, latitude=53.9, longitude=27.56, distance=5, ordering="distance"
+    )
+    places = list(plan.get_queryset())
+    assert [place.id for place in places] == [near_place.id, far_place.id]
+    assert 0.6 < places[0].distance.km < 0.7
+
+
+@pytest.mark.django_db
+def test_filter_plan_sql(user_factory):
+    user = user_factory.create()
+    plan = PlaceFilterPlan(
+        user,
+        latitude=53.9,
+        longitude=27.56,
+        distance=5,
+        categories=["art"],
+        rating=3,
+        ordering="-rating",
+    )
+    sql, params = plan.get_sql()
+    assert "JOIN" not in sql
+    assert "ST_DWithin" in sql and "::geography" in sql
+    assert sql.endswith(
+        'ORDER BY "routes4life_api_place"."author_rating" DESC, "routes4life_api_place"."id" DESC'
+    )
+    assert PlaceCategory.ART in params
+
+    plan = PlaceFilterPlan(user, search_terms=["cafe", "main"])
+    sql, params = plan.get_sql()
+    assert '"search_vector" @@' in sql and "to_tsquery" in sql
+    # plain ILIKE, trigram indexes don't serve UPPER() of the field
+    assert '"name" ILIKE' in sql and '"address" ILIKE' in sql
+    assert "UPPER" not in sql
+    assert {"cafe:*", "main:*", "%cafe%", "%main%"} <= set(params)
+
+
+@pytest.mark.django_db
+def test_filter_plan_search_rank(user_factory):
+    user = user_factory.create()
+    by_address = create_place(user, name="Bakery", address="12 Cafe street")
+    by_name = create_place(user, name="Central cafe", address="Main street")
+    create_place(user, name="Museum", address="Main street")
+
+    plan = PlaceFilterPlan(user, search_terms=["caf"])
+    assert [place.id for place in plan.get_queryset()] == [by_name.id, by_address.id]
+
+    plan = PlaceFilterPlan(user, search_terms=["caf", "main"])
+    assert [place.id for place in plan.get_queryset()] == [by_name.id]
+
+    plan = PlaceFilterPlan(user, search_terms=["%"])
+    assert plan.get_queryset().count() == 3
+
+    # substrings inside words aren't ranked, they keep the order of ids
+    plan = PlaceFilterPlan(user, search_terms=["afe"])
+    assert [place.id for place in plan.get_queryset()] == [by_address.id, by_name.id]
@@ -0,0 +1,58 @@
+import pytest
+from django.test import RequestFactory
+from routes4life_api.models import Place, PlaceImage, PlaceRating, User
+from routes4life_api.place_rows import serialize_places
+from routes4life_api.serializers import GetPlaceSerializer
+
+from tests.factories import create_place
+
+
+@pytest.fixture
+def places_of_two_users(user_factory, unsigned_media_urls):
+    user = user_factory.create()
+    other_user = User.objects.create_user("other@routes4life.test", "pA$$wd12")
+    place = create_place(user, main_image="test/main.png")
+    PlaceImage.objects.create(place=place, image="test/secondary_1.png")
+    PlaceImage.objects.create(place=place, image="test/secondary_2.png")
+    create_place(user, rating=0)
+    other_place = create_place(other_user, main_image="test/other.png")
+    PlaceRating.objects.create(user=user, place=other_place, rating="4.50")
+    create_place(other_user)
+    return user, other_user
+
+
+def assert_same_as_serializer(queryset, context):
+    expected = [GetPlaceSerializer(place, context=context).data for place in queryset]
+    assert serialize_places(queryset, context) == expected
+    assert GetPlaceSerializer(queryset, many=True, context=context).data == expected
+
+
+@pytest.mark.django_db
+def test_place_rows_parity(places_of_two_users):
+    user, other_user = places_of_two_users
+    queryset = Place.objects.order_by("id")
+    assert_same_as_serializer(queryset, {"user": user})
+    assert_same_as_serializer(queryset, {"user": other_user})
+    assert_same_as_serializer(user.places.order_by("-id"), {"user": user})
+
+
+@pytest.mark.django_db
+def test_place_rows_parity_with_request(places_of_two_users):
+    user, _ = places_of_two_users
+    context = {"user": user, "request": RequestFactory().get("/api/places/")}
+    assert_same_as_serializer(Place.objects.order_by("id"), context)
+
+
+@pytest.mark.django_db
+def test_place_rows_parity_empty(places_of_two_users):
+    user, _ = places_of_two_users
+    assert_same_as_serializer(Place.objects.none(), {"user": user})
+    assert serialize_places(Place.objects.none(), {"user": user}) == []
+
+
+@pytest.mark.django_db
+def test_place_rows_queries(places_of_two_users, django_assert_num_queries):
+    user, _ = places_of_two_users
+    # places, ratings of the context user, secondary images
+    with django_assert_num_queries(3):
+        serialize_places(Place.objects.all(), {"user": user})
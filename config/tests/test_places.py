@@ -0,0 +1,804 @@
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from routes4life_api.models import (
+    DeletedPlace,
+    Place,
+    PlaceCategory,
+    PlaceImage,
+    PlaceRating,
+    User,
+)
+from routes4life_api.place_import import iter_geojson_features
+from routes4life_api.queries import get_top_places_by_category
+from routes4life_api.serializers import GetPlaceSerializer
+
+from tests.factories import (
+    PlaceImageFactory,
+    PlaceRatingFactory,
+    create_place,
+    fake_password,
+)
+
+
+def get_auth_header(client, user):
+    password = fake_password()
+    user.set_password(password)
+    user.save()
+    access_token = client.post(
+        "/api/auth/get-token/", {"email": user.email, "password": password}
+    ).json()["access"]
+    return {"HTTP_AUTHORIZATION": f"JWT {access_token}"}
+
+
+@pytest.mark.django_db
+def test_get_place_serializer_list_queries(
+    user_factory, django_assert_num_queries, unsigned_media_urls
+):
+    user = user_factory.create()
+    for _ in range(5):
+        place = create_place(user)
+        for i in range(2):
+            PlaceImage.objects.create(place=place, image=f"test/{place.id}_{i}.png")
+
+    # places with authors, secondary images, ratings of the context user
+    with django_assert_num_queries(3):
+        data = GetPlaceSerializer(
+            Place.objects.all(), many=True, context={"user": user}
+        ).data
+    assert len(data) == 5
+    assert all(len(item["secondary_images"]) == 2 for item in data)
+    assert all(item["added_by"] == user.email and item["can_edit"] for item in data)
+
+    places = list(Place.objects.all())
+    with django_assert_num_queries(3):
+        list_data = GetPlaceSerializer(places, many=True, context={"user": user}).data
+    assert list_data == data
+
+    place = places[0]
+    single_data = GetPlaceSerializer(place, context={"user": user}).data
+    assert single_data["rating"] == place.ratings.get(user=user).rating
+
+
+@pytest.mark.django_db
+def test_places_cursor_pagination(client, user_factory):
+    user = user_factory.create()
+    place_ids = [create_place(user).id for _ in range(5)]
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/", {"page_size": 2}, **auth_header)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [item["id"] for item in first_page["results"]] == place_ids[:-3:-1]
+    assert first_page["previous"] is None
+
+    response = client.get(first_page["next"], **auth_header)
+    second_page = response.json()
+    assert [item["id"] for item in second_page["results"]] == place_ids[-3:-5:-1]
+
+    response = client.get(second_page["previous"], **auth_header)
+    assert response.json()["results"] == first_page["results"]
+
+    response = client.get("/api/places/", {"paginate": "false"}, **auth_header)
+    assert sorted(item["id"] for item in response.json()) == place_ids
+
+    response = client.get("/api/homepage/", {"page_size": 3}, **auth_header)
+    homepage_data = response.json()
+    assert homepage_data["email"] == user.email
+    assert len(homepage_data["places"]) == 3 and homepage_data["next"] is not None
+
+
+@pytest.mark.django_db
+def test_places_streaming(client, user_factory):
+    user = user_factory.create()
+    for _ in range(7):
+        create_place(user)
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/", {"paginate": "false"}, **auth_header)
+    expected = sorted(response.json(), key=lambda item: item["id"])
+
+    response = client.get("/api/places/", {"stream": "true"}, **auth_header)
+    assert response.status_code == 200 and response.streaming
+    streamed = json.loads(b"".join(response.streaming_content))
+    assert sorted(streamed, key=lambda item: item["id"]) == expected
+
+    response = client.get(
+        "/api/places/",
+        {"stream": "true"},
+        HTTP_ACCEPT="application/x-ndjson",
+        **auth_header,
+    )
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == [
+        place["id"] for place in expected
+    ]
+    response = client.get(
+        "/api/places/",
+        {"stream": "true"},
+        HTTP_ACCEPT="application/geo+json-seq",
+        **auth_header,
+    )
+    records = b"".join(response.streaming_content).split(b"\x1e")[1:]
+    assert len(records) == len(expected)
+
+    response = client.get(
+        "/api/places/search/", {"stream": "true", "search": "nothing"}, **auth_header
+    )
+    assert json.loads(b"".join(response.streaming_content)) == []
+
+
+@pytest.mark.django_db
+def test_filter_places_by_author_rating(client, user_factory):
+    user = user_factory.create()
+    center = {"latitude": 53.9, "longitude": 27.56}
+    for rating in ("1.00", "3.00", "4.50"):
+        create_place(user, rating=rating, location=Point(27.561, 53.901, srid=4326))
+    unrated_place = create_place(user, location=Point(27.562, 53.902, srid=4326))
+    unrated_place.ratings.all().delete()
+    Place.objects.filter(pk=unrated_place.pk).update_rating_stats()
+    auth_header = get_auth_header(client, user)
+
+    response = client.post(
+        "/api/places/filter/",
+        {**center, "distance": 5, "rating": "3.00", "ordering": "-rating"},
+        content_type="application/json",
+        **auth_header,
+    )
+    assert response.status_code == 200
+    places = response.json()["places"]
+    # places without author rating come first in descending order
+    assert [place["rating"] for place in places] == [0, 4.5, 3.0]
+
+    response = client.post(
+        "/api/places/new_filter/",
+        {
+            **center,
+            "applyFilters": True,
+            "splitCategories": False,
+            "rating": "4.00",
+        },
+        content_type="application/json",
+        **auth_header,
+    )
+    assert len(response.json()["places"]) == 2
+
+
+@pytest.mark.django_db
+def test_backfill_place_ratings(user_factory):
+    user = user_factory.create()
+    place = create_place(user, rating="2.50")
+    other_user = User.objects.create_user("other@routes4life.test", "pA$$wd12")
+    PlaceRating.objects.create(user=other_user, place=place, rating="4.50")
+    Place.objects.update(author_rating=None, average_rating=None, ratings_count=0)
+
+    call_command("backfill_place_ratings", batch_size=1)
+    place.refresh_from_db()
+    assert place.author_rating == Decimal("2.50")
+    assert place.average_rating == Decimal("3.50")
+    assert place.ratings_count == 2
+
+
+@pytest.mark.django_db
+def test_filter_places_split_by_categories(
+    client, user_factory, django_assert_num_queries
+):
+    user = user_factory.create()
+    place_ids = {}
+    for category in (PlaceCategory.ART, PlaceCategory.CITY, PlaceCategory.SPORT):
+        place_ids[category.label] = [
+            create_place(user, category=category).id for _ in range(3)
+        ]
+    auth_header = get_auth_header(client, user)
+
+    response = client.post(
+        "/api/places/filter/?per_category=2",
+        {},
+        content_type="application/json",
+        **auth_header,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data.pop("filtersApplied") is False
+    assert {
+        category: [place["id"] for place in places] for category, places in data.items()
+    } == {category: ids[:-3:-1] for category, ids in place_ids.items()}
+
+    # ranked places, authors, secondary images, ratings
+    with django_assert_num_queries(4):
+        places = get_top_places_by_category(user.places.order_by("id"), 1)
+        GetPlaceSerializer(places, many=True, context={"user": user}).data
+    assert [place.id for place in places] == [ids[0] for ids in place_ids.values()]
+
+
+@pytest.mark.django_db
+def test_places_by_one_category(client, user_factory):
+    user = user_factory.create()
+    art_place = create_place(user, category=PlaceCategory.ART)
+    create_place(user, category=PlaceCategory.CITY)
+    auth_header = get_auth_header(client, user)
+
+    response = client.get(
+        "/api/places/by_category/",
+        {"search": "ART", "paginate": "false"},
+        **auth_header,
+    )
+    assert response.status_code == 200
+    assert [(place["id"], place["category"]) for place in response.json()] == [
+        (art_place.id, "art")
+    ]
+
+    response = client.get(
+        "/api/places/by_category/",
+        {"search": "unknown", "paginate": "false"},
+        **auth_header,
+    )
+    assert response.json() == []
+
+
+@pytest.mark.django_db
+def test_k_nearest_places(client, user_factory):
+    user = user_factory.create()
+    # ~1, 3, 30 and 300 km north of the center
+    place_ids = [
+        create_place(user, location=Point(27.56, 53.9 + offset, srid=4326)).id
+        for offset in (0.0270, 0.009, 2.7, 0.27)
+    ]
+    auth_header = get_auth_header(client, user)
+    center = {"lat": 53.9, "lon": 27.56}
+
+    response = client.get("/api/places/nearest/", {**center, "k": 3}, **auth_header)
+    assert response.status_code == 200
+    places = response.json()
+    assert [place["id"] for place in places] == [
+        place_ids[1],
+        place_ids[0],
+        place_ids[3],
+    ]
+    assert [round(place["distance"]) for place in places] == [1, 3, 30]
+
+    response = client.get(
+        "/api/places/nearest/", {**center, "k": 3, "dist": 5}, **auth_header
+    )
+    assert [place["id"] for place in response.json()] == place_ids[1::-1]
+
+    response = client.get("/api/places/nearest/", {**center, "k": 0}, **auth_header)
+    assert response.status_code == 400
+
+    response = client.get(
+        "/api/places/nearest/", {**center, "k": 3, "stream": "true"}, **auth_header
+    )
+    assert response.streaming
+    streamed = json.loads(b"".join(response.streaming_content))
+    assert streamed == places
+
+
+@pytest.mark.django_db
+def test_viewport_places(client, user_factory):
+    user = user_factory.create()
+    minsk_ids = {
+        create_place(user, location=Point(27.56 + offset, 53.9, srid=4326)).id
+        for offset in (0, 0.001, 0.002)
+    }
+    create_place(user, location=Point(37.6, 55.75, srid=4326))
+    create_place(user, location=Point(2.35, 48.85, srid=4326))
+    auth_header = get_auth_header(client, user)
+
+    response = client.get(
+        "/api/places/viewport/", {"bbox": "20,50,40,60", "zoom": 5}, **auth_header
+    )
+    assert response.status_code == 200
+    clusters = sorted(response.json()["clusters"], key=lambda c: c["count"])
+    assert [cluster["count"] for cluster in clusters] == [1, 3]
+    assert clusters[1]["longitude"] == pytest.approx(27.561)
+
+    response = client.get(
+        "/api/places/viewport/",
+        {"bbox": "27.5,53.8,27.6,54", "zoom": 16},
+        **auth_header,
+    )
+    assert {place["id"] for place in response.json()["places"]} == minsk_ids
+
+    east_place = create_place(user, location=Point(179.9, 0, srid=4326))
+    west_place = create_place(user, location=Point(-179.9, 0, srid=4326))
+    response = client.get(
+        "/api/places/viewport/", {"bbox": "179,-1,-179,1", "zoom": 16}, **auth_header
+    )
+    assert {place["id"] for place in response.json()["places"]} == {
+        east_place.id,
+        west_place.id,
+    }
+
+    response = client.get(
+        "/api/places/viewport/", {"bbox": "20,60,40,50", "zoom": 5}, **auth_header
+    )
+    assert response.status_code == 400
+    for bbox in ("nan,0,1,1", "0,0,inf,1", "0,-nan,1,1"):
+        response = client.get(
+            "/api/places/viewport/", {"bbox": bbox, "zoom": 5}, **auth_header
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_place_tiles(client, user_factory, django_capture_on_commit_callbacks):
+    user = user_factory.create()
+    create_place(user, name="Old town cafe", location=Point(27.56, 53.9, srid=4326))
+    create_place(
+        user_factory.create(email="other@routes4life.test"), name="Other user's place"
+    )
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/tiles/0/0/0.mvt", **auth_header)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert b"Old town cafe" in response.content
+    assert b"Other user's place" not in response.content
+
+    # the western hemisphere tile at zoom 1 has no places
+    response = client.get("/api/places/tiles/1/0/0.mvt", **auth_header)
+    assert response.content == b""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        create_place(user, name="New bakery", location=Point(27.5, 53.8, srid=4326))
+    response = client.get("/api/places/tiles/0/0/0.mvt", **auth_header)
+    assert b"New bakery" in response.content
+
+    response = client.get("/api/places/tiles/1/2/0.mvt", **auth_header)
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_place_responses_cached(
+    client, user_factory, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    user = user_factory.create()
+    create_place(user)
+    auth_header = get_auth_header(client, user)
+
+    places = client.get("/api/places/", {"paginate": "false"}, **auth_header).json()
+    # only the user is read to authenticate the request
+    with django_assert_num_queries(1):
+        response = client.get("/api/places/", {"paginate": "false"}, **auth_header)
+    assert response.json() == places
+
+    with django_capture_on_commit_callbacks(execute=True):
+        new_place = create_place(user)
+    response = client.get("/api/places/", {"paginate": "false"}, **auth_header)
+    assert new_place.id in [place["id"] for place in response.json()]
+
+    client.get("/api/homepage/", **auth_header)
+    with django_assert_num_queries(1):
+        client.get("/api/homepage/", **auth_header)
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = "Changed"
+        user.save()
+    assert client.get("/api/homepage/", **auth_header).json()["firstName"] == "Changed"
+
+
+@pytest.mark.django_db
+def test_place_conditional_get(
+    client, user_factory, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    user = user_factory.create()
+    place = create_place(user)
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/search/", {"search": "a"}, **auth_header)
+    etag = response["ETag"]
+    # only authentication, the validator is cached under the data version
+    with django_assert_num_queries(1):
+        response = client.get(
+            "/api/places/search/",
+            {"search": "a"},
+            HTTP_IF_NONE_MATCH=etag,
+            **auth_header,
+        )
+    assert response.status_code == 304
+    response = client.get(
+        "/api/places/search/",
+        {"search": "b"},
+        HTTP_IF_NONE_MATCH=etag,
+        **auth_header,
+    )
+    assert response.status_code == 200
+
+    other_user = user_factory.create(email="other@routes4life.test")
+    with django_capture_on_commit_callbacks(execute=True):
+        place.ratings.create(user=other_user, rating=1)
+    response = client.get(
+        "/api/places/search/",
+        {"search": "a"},
+        HTTP_IF_NONE_MATCH=etag,
+        **auth_header,
+    )
+    assert response.status_code == 200 and response["ETag"] != etag
+
+    response = client.get(
+        "/api/places/search/",
+        {"search": "a"},
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        **auth_header,
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_search_places_substrings(client, user_factory):
+    user = user_factory.create()
+    restaurant = create_place(
+        user,
+        name="Old town",
+        address="Main street",
+        category=PlaceCategory.CAFES_AND_RESTAURANTS,
+    )
+    bakery = create_place(
+        user,
+        name="Sunny corner",
+        address="Park street",
+        category=PlaceCategory.PASTRY_SHOPS_AND_BAKERIES,
+    )
+    riverside = create_place(user, name="Riverside", address="Embankment 5")
+    auth_header = get_auth_header(client, user)
+
+    def search(terms):
+        response = client.get(
+            "/api/places/search/",
+            {"search": terms, "paginate": "false"},
+            **auth_header,
+        )
+        return {place["id"] for place in response.json()}
+
+    # words of category labels
+    assert search("restaurants") == {restaurant.id}
+    assert search("bakeries") == {bakery.id}
+    assert search("pastry shops") == {bakery.id}
+    # substrings inside words of names and addresses
+    assert search("side") == {riverside.id}
+    assert search("bankment") == {riverside.id}
+    assert search("own main") == {restaurant.id}
+
+
+@pytest.mark.django_db
+def test_places_sync(client, user_factory):
+    user, other_user = user_factory.create_batch(2)
+    kept_place, updated_place, deleted_place = [create_place(user) for _ in range(3)]
+    other_place, other_deleted_place = [create_place(other_user) for _ in range(2)]
+    Place.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/sync/", **auth_header).json()
+    assert response["full"] is True and response["next"] is None
+    assert {place["id"] for place in response["places"]} == {
+        kept_place.id,
+        updated_place.id,
+        deleted_place.id,
+    }
+
+    updated_place.name = "Renamed"
+    updated_place.save()
+    deleted_place.delete()
+    new_place = create_place(user)
+    other_place.name = "Renamed"
+    other_place.save()
+    other_deleted_place.delete()
+    response = client.get(
+        "/api/places/sync/", {"since": response["token"]}, **auth_header
+    ).json()
+    assert response["full"] is False
+    assert [place["id"] for place in response["places"]] == [
+        updated_place.id,
+        new_place.id,
+    ]
+    assert response["deleted"] == [deleted_place.id]
+
+    response = client.get("/api/places/sync/", {"since": "forged"}, **auth_header)
+    assert response.status_code == 400
+    other_token = client.get(
+        "/api/places/sync/", **get_auth_header(client, other_user)
+    ).json()["token"]
+    response = client.get("/api/places/sync/", {"since": other_token}, **auth_header)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_places_sync_pages(client, user_factory):
+    user = user_factory.create()
+    places = [create_place(user) for _ in range(3)]
+    auth_header = get_auth_header(client, user)
+
+    first_page = client.get("/api/places/sync/", {"page_size": 2}, **auth_header).json()
+    assert first_page["full"] is True
+    last_page = client.get(first_page["next"], **auth_header).json()
+    assert last_page["next"] is None
+    # the sync continues from the time of the first page
+    assert last_page["token"] == first_page["token"]
+    assert [place["id"] for place in first_page["places"] + last_page["places"]] == [
+        place.id for place in reversed(places)
+    ]
+
+
+@pytest.mark.django_db
+def test_delete_user_with_places(client, user_factory):
+    user, other_user = user_factory.create_batch(2)
+    places = [create_place(user) for _ in range(2)]
+    other_place = create_place(other_user)
+    PlaceImageFactory.create(place=places[0])
+    PlaceRatingFactory.create(user=other_user, place=places[1])
+    auth_header = get_auth_header(client, user)
+
+    response = client.delete("/api/users/settings/", **auth_header)
+    assert response.status_code == 204
+    assert list(Place.objects.values_list("id", flat=True)) == [other_place.id]
+    assert not PlaceImage.objects.exists()
+    assert list(PlaceRating.objects.values_list("place_id", flat=True)) == [
+        other_place.id
+    ]
+    assert set(DeletedPlace.objects.values_list("place_id", "added_by_id")) == {
+        (place.id, user.id) for place in places
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create_places(client, user_factory, django_assert_max_num_queries):
+    user = user_factory.create()
+    auth_header = get_auth_header(client, user)
+    places = [
+        {
+            "name": f"Route stop {index}",
+            "address": "Main street",
+            "category": "city",
+            "latitude": 53.9,
+            "longitude": 27.56 + index / 100,
+            "rating": "4.00",
+        }
+        for index in range(20)
+    ]
+
+    # authentication, the transaction, two inserts and the response
+    with django_assert_max_num_queries(8):
+        response = client.post(
+            "/api/places/bulk/",
+            {"places": places},
+            content_type="application/json",
+            **auth_header,
+        )
+    assert response.status_code == 201
+    created = response.json()["places"]
+    assert [place["name"] for place in created] == [place["name"] for place in places]
+    assert all(place["rating"] == 4.0 for place in created)
+    assert PlaceRating.objects.filter(place__added_by=user).count() == 20
+
+    places[3]["category"] = "unknown"
+    response = client.post(
+        "/api/places/bulk/",
+        {"places": places},
+        content_type="application/json",
+        **auth_header,
+    )
+    assert response.status_code == 400
+    assert response.json()["oldRepr"]["places"][3]
+    assert user.places.count() == 20
+
+    # a bare list of places
+    response = client.post(
+        "/api/places/bulk/", places[:3], content_type="application/json", **auth_header
+    )
+    assert response.status_code == 201 and len(response.json()["places"]) == 3
+    response = client.post(
+        "/api/places/bulk/",
+        json.dumps("places"),
+        content_type="application/json",
+        **auth_header,
+    )
+    assert response.status_code == 400
+
+    # too many places fail before any of them is validated
+    response = client.post(
+        "/api/places/bulk/",
+        {"places": [{}] * 101},
+        content_type="application/json",
+        **auth_header,
+    )
+    assert response.status_code == 400
+    assert response.json()["errors"] == ["Up to 100 places can be created at once."]
+
+
+@pytest.mark.django_db
+def test_import_places(user_factory, tmp_path):
+    user = user_factory.create()
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [27.56, 53.9 + index / 100]},
+            "properties": {
+                "name": f"Partner place {index}",
+                "address": "Main street",
+                "category": "art",
+                "rating": 4.5,
+            },
+        }
+        for index in range(5)
+    ]
+    features[3]["properties"]["description"] = "By the river"
+    features[4]["properties"]["description"] = ""
+    features[1]["properties"]["category"] = "unknown"
+    features[2]["geometry"]["coordinates"] = [27.56, 91]
+    dataset = tmp_path / "places.geojson"
+    dataset.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    rejects = tmp_path / "rejects.csv"
+
+    call_command("import_places", str(dataset), user=user.email, rejects=str(rejects))
+    places = list(user.places.order_by("id"))
+    assert [place.name for place in places] == [
+        "Partner place 0",
+        "Partner place 3",
+        "Partner place 4",
+    ]
+    assert places[1].location.y == pytest.approx(53.93)
+    assert places[1].author_rating == Decimal("4.50")
+    assert [place.description for place in places] == ["", "By the river", ""]
+    assert PlaceRating.objects.filter(place__in=places, user=user).count() == 3
+    assert rejects.read_text().splitlines()[1:] == [
+        "2,category: Unallowed category.",
+        "3,latitude: Latitude is supposed to be between -90 and 90.",
+    ]
+
+    dataset = tmp_path / "places.csv"
+    dataset.write_text(
+        "name,description,address,category,latitude,longitude,rating\n"
+        "Csv place,,Main street,city,53.9,27.56,3\n"
+    )
+    call_command("import_places", str(dataset), user=user.email)
+    assert user.places.filter(
+        name="Csv place", category=PlaceCategory.CITY, description=""
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_seed_places():
+    call_command("seed_places", users=3, places_per_user=50, seed=1, batch_size=2)
+    users = User.objects.filter(email__startswith="seed-")
+    assert users.count() == 3
+    assert not users[0].has_usable_password()
+    places = Place.objects.filter(added_by__in=users)
+    assert places.count() == 150
+    assert set(places.values_list("category", flat=True)) <= set(PlaceCategory.values)
+    assert not places.filter(search_vector=None).exists()
+    assert PlaceRating.objects.filter(place__in=places).count() == 150
+    for place in places:
+        assert 13 < place.location.x < 41 and 48 < place.location.y < 61
+        assert place.author_rating == place.average_rating
+    # empty descriptions are not read as NULL
+    assert places.filter(description="").exists()
+
+    # the same seed repeats users and places
+    def get_dataset():
+        return list(
+            Place.objects.filter(added_by__email__startswith="seed-")
+            .order_by("id")
+            .values_list("added_by__email", "name", "address", "category", "location")
+        )
+
+    dataset = get_dataset()
+    users.delete()
+    call_command("seed_places", users=3, places_per_user=50, seed=1)
+    assert get_dataset() == dataset
+    with pytest.raises(CommandError):
+        call_command("seed_places", users=3, places_per_user=50, seed=1)
+
+
+def test_import_geojson_malformed_feature():
+    head = '{"type": "FeatureCollection", "features": [{"type": "Feature"}, '
+    file = io.StringIO(head + '{"type": ' + " " * 1000 + "]}")
+    features = iter_geojson_features(file, chunk_size=16, max_feature_size=64)
+    assert next(features) == {"type": "Feature"}
+    with pytest.raises(ValueError, match=f"at character {len(head)} "):
+        next(features)
+    # the rest of the file is not buffered for the broken feature
+    assert file.tell() < len(head) + 200
+
+
+@pytest.mark.django_db
+def test_export_places(client, user_factory, tmp_path):
+    user = user_factory.create()
+    place_ids = [create_place(user, category=PlaceCategory.ART).id for _ in range(3)]
+    create_place(user_factory.create(email="other@routes4life.test"))
+    auth_header = get_auth_header(client, user)
+
+    response = client.get("/api/places/export/", **auth_header)
+    assert response["Content-Type"] == "application/geo+json"
+    collection = json.loads(b"".join(response.streaming_content))
+    assert collection["type"] == "FeatureCollection"
+    assert [feature["id"] for feature in collection["features"]] == place_ids
+    assert collection["features"][0]["properties"]["canEdit"] is True
+
+    response = client.get("/api/places/export/", {"file_format": "csv"}, **auth_header)
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0].startswith("id,added_by,rating,can_edit,latitude,longitude")
+    assert len(lines) == 4
+
+    response = client.get("/api/places/export/", {"all_users": "true"}, **auth_header)
+    assert response.status_code == 403
+
+    # an export can be imported back
+    output = tmp_path / "places.csv"
+    call_command(
+        "export_places", user=user.email, file_format="csv", output=str(output)
+    )
+    call_command("import_places", str(output), user=user.email)
+    assert user.places.count() == 6
+
+    output = tmp_path / "all.ndjson"
+    call_command("export_places", all=True, file_format="ndjson", output=str(output))
+    assert len(output.read_text().splitlines()) == Place.objects.count()
+    with pytest.raises(CommandError):
+        call_command("export_places", "--all", "--user", user.email)
+
+
+@pytest.mark.django_db
+def test_autocomplete_places(
+    client, user_factory, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    user = user_factory.create()
+    cafe = create_place(
+        user,
+        name="Old town cafe",
+        address="Lenina street 5",
+        location=Point(27.56, 53.9, srid=4326),
+    )
+    museum = create_place(
+        user,
+        name="Art museum",
+        address="Karla Marksa street 12",
+        location=Point(30.33, 59.93, srid=4326),
+    )
+    create_place(
+        user_factory.create(email="other@routes4life.test"), name="Old town cafe"
+    )
+    auth_header = get_auth_header(client, user)
+
+    # a typo in the prefix
+    response = client.get("/api/places/autocomplete/", {"q": "Caffe"}, **auth_header)
+    assert response.status_code == 200
+    assert response.json()["suggestions"] == [
+        {
+            "id": cafe.id,
+            "name": "Old town cafe",
+            "address": "Lenina street 5",
+            "category": "other",
+        }
+    ]
+    response = client.get("/api/places/autocomplete/", {"q": "marks"}, **auth_header)
+    assert [place["id"] for place in response.json()["suggestions"]] == [museum.id]
+
+    response = client.get(
+        "/api/places/autocomplete/",
+        {"q": "street", "lat": 53.9, "lon": 27.56, "dist": 5},
+        **auth_header,
+    )
+    assert [place["id"] for place in response.json()["suggestions"]] == [cafe.id]
+
+    # the same query in another case is read from the cache
+    with django_assert_num_queries(1):
+        response = client.get(
+            "/api/places/autocomplete/", {"q": " CAFFE "}, **auth_header
+        )
+    assert len(response.json()["suggestions"]) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        create_place(user, name="Cafe central", address="Nezavisimosti avenue 1")
+    response = client.get("/api/places/autocomplete/", {"q": "caffe"}, **auth_header)
+    assert len(response.json()["suggestions"]) == 2
+
+    response = client.get(
+        "/api/places/autocomplete/", {"q": "cafe", "lat": 53.9}, **auth_header
+    )
+    assert response.status_code == 400
@@ -0,0 +1,369 @@
+"""
+Budgets of SQL queries and Redis round trips per endpoint.
+Budgets don't depend on the number of places, every endpoint is checked
+with 1, 10 and 100 places of the user and of another user, so a query
+per place, like an N+1 in a serializer, exceeds the budget.
+
+Responses are requested with cold caches, the most expensive path.
+Uploaded images are saved to a temporary directory instead of the bucket.
+"""
+import io
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Callable, NamedTuple
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from redis.client import Pipeline, Redis
+from rest_framework_simplejwt.tokens import AccessToken
+from routes4life_api.models import Place, PlaceCategory, PlaceImage, PlaceRating, User
+from routes4life_api.sync import make_sync_token
+from routes4life_api.urls import urlpatterns
+from routes4life_api.utils import ResetCodeManager, SessionTokenManager
+
+from tests.factories import create_place, fake_password
+
+PLACES_COUNTS = (1, 10, 100)
+NEW_PASSWORD = fake_password()
+
+
+class Budget(NamedTuple):
+    url_name: str
+    method: str
+    queries: int
+    cache_round_trips: int
+    # query params or the JSON body, and kwargs of the url, built from the dataset
+    data: Callable = lambda dataset: {}
+    url_kwargs: Callable = lambda dataset: {}
+    authenticated: bool = True
+    # a multipart form instead of a JSON body
+    multipart: bool = False
+
+    def __str__(self):
+        return f"{self.url_name}-{self.method}"
+
+
+def disposable_place(dataset):
+    # a place without files, so nothing is removed from the storage
+    return {"pk": create_place(dataset.user).id}
+
+
+def image_file(name):
+    content = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(content, format="PNG")
+    return SimpleUploadedFile(name, content.getvalue(), "image/png")
+
+
+BUDGETS = [
+    Budget(
+        "get_token_pair",
+        "post",
+        queries=1,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "email": dataset.user.email,
+            "password": dataset.password,
+        },
+        authenticated=False,
+    ),
+    Budget(
+        "register",
+        "post",
+        queries=2,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "email": "new@routes4life.test",
+            "password": NEW_PASSWORD,
+            "confirmation_password": NEW_PASSWORD,
+        },
+        authenticated=False,
+    ),
+    Budget(
+        "change_email",
+        "patch",
+        queries=3,
+        cache_round_trips=0,
+        data=lambda dataset: {"email": "changed@routes4life.test"},
+    ),
+    Budget(
+        "change_password",
+        "patch",
+        queries=2,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "password": dataset.password,
+            "new_password": NEW_PASSWORD,
+            "confirmation_password": NEW_PASSWORD,
+        },
+    ),
+    # sending the reset code by email is left out, it calls the email service
+    Budget(
+        "reset-password",
+        "post",
+        queries=1,
+        cache_round_trips=5,
+        data=lambda dataset: {
+            "email": dataset.user.email,
+            "code": ResetCodeManager.get_or_create_code(dataset.user.email),
+        },
+        authenticated=False,
+    ),
+    Budget(
+        "reset-password",
+        "patch",
+        queries=3,
+        cache_round_trips=2,
+        data=lambda dataset: {
+            "email": dataset.user.email,
+            "session_token": SessionTokenManager.get_or_create_token(
+                dataset.user.email
+            ),
+            "new_password": NEW_PASSWORD,
+            "confirmation_password": NEW_PASSWORD,
+        },
+        authenticated=False,
+    ),
+    Budget("user_settings", "get", queries=1, cache_round_trips=0),
+    Budget(
+        "user_settings",
+        "patch",
+        queries=2,
+        cache_round_trips=0,
+        data=lambda dataset: {"first_name": "Changed"},
+    ),
+    # places are deleted in bulk, not by cascades sending signals for each
+    Budget("user_settings", "delete", queries=16, cache_round_trips=0),
+    Budget("homepage", "get", queries=6, cache_round_trips=10),
+    Budget("places_list_create", "get", queries=6, cache_round_trips=10),
+    Budget(
+        "places_list_create",
+        "post",
+        queries=11,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "name": "Route stop",
+            "address": "Main street",
+            "category": "city",
+            "latitude": 53.9,
+            "longitude": 27.56,
+            "rating": "4.00",
+            "main_image": image_file("main.png"),
+        },
+        multipart=True,
+    ),
+    Budget(
+        "places_update_delete",
+        "patch",
+        queries=8,
+        cache_round_trips=0,
+        data=lambda dataset: {"name": "Renamed place"},
+        url_kwargs=lambda dataset: {"pk": dataset.place.id},
+    ),
+    Budget(
+        "places_update_delete",
+        "delete",
+        queries=9,
+        cache_round_trips=0,
+        url_kwargs=disposable_place,
+    ),
+    Budget(
+        "places_bulk_create",
+        "post",
+        queries=8,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "places": [
+                {
+                    "name": "Route stop",
+                    "address": "Main street",
+                    "category": "city",
+                    "latitude": 53.9,
+                    "longitude": 27.56,
+                    "rating": "4.00",
+                }
+            ]
+        },
+    ),
+    Budget("places_export", "get", queries=4, cache_round_trips=0),
+    Budget("places_sync", "get", queries=4, cache_round_trips=0),
+    # every place of the dataset changed since the previous sync, and the log
+    # of deleted places is read
+    Budget(
+        "places_sync",
+        "get",
+        queries=5,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "since": make_sync_token(dataset.user, timezone.now() - timedelta(hours=1))
+        },
+    ),
+    Budget(
+        "place_images",
+        "put",
+        queries=10,
+        cache_round_trips=0,
+        url_kwargs=lambda dataset: {"pk": dataset.place.id},
+    ),
+    Budget(
+        "nearest_places",
+        "get",
+        queries=5,
+        cache_round_trips=7,
+        data=lambda dataset: {"lat": 53.9, "lon": 27.56, "dist": 10},
+    ),
+    Budget(
+        "viewport_places",
+        "get",
+        queries=5,
+        cache_round_trips=7,
+        data=lambda dataset: {"bbox": "27,53.5,28,54.5", "zoom": 16},
+    ),
+    Budget(
+        "place_tiles",
+        "get",
+        queries=2,
+        cache_round_trips=7,
+        url_kwargs=lambda dataset: {"z": 0, "x": 0, "y": 0},
+    ),
+    Budget(
+        "search_places",
+        "get",
+        queries=6,
+        cache_round_trips=10,
+        data=lambda dataset: {"search": "old town"},
+    ),
+    Budget(
+        "autocomplete_places",
+        "get",
+        queries=2,
+        cache_round_trips=7,
+        data=lambda dataset: {"q": "old town"},
+    ),
+    Budget("filter_places", "post", queries=5, cache_round_trips=0),
+    Budget(
+        "filter_places_new",
+        "post",
+        queries=4,
+        cache_round_trips=0,
+        data=lambda dataset: {
+            "apply_filters": True,
+            "split_categories": False,
+            "latitude": 53.9,
+            "longitude": 27.56,
+        },
+    ),
+    Budget(
+        "places_by_one_category",
+        "get",
+        queries=6,
+        cache_round_trips=10,
+        data=lambda dataset: {"search": "art"},
+    ),
+]
+
+
+def create_places(user, count):
+    places = Place.objects.bulk_create(
+        Place(
+            added_by=user,
+            name=f"Old town cafe {number}",
+            address=f"Lenina street {number}",
+            category=PlaceCategory.ART,
+            location=Point(27.56 + number / 1000, 53.9, srid=4326),
+            main_image="test/main.png",
+            author_rating=4,
+            average_rating=4,
+            ratings_count=1,
+        )
+        for number in range(count)
+    )
+    PlaceRating.objects.bulk_create(
+        PlaceRating(user=user, place=place, rating=4) for place in places
+    )
+    PlaceImage.objects.bulk_create(
+        PlaceImage(place=place, image="test/secondary.png") for place in places
+    )
+    return places
+
+
+@pytest.fixture(params=PLACES_COUNTS)
+def dataset(request, user_factory, unsigned_media_urls):
+    user = user_factory.create()
+    password = fake_password()
+    user.set_password(password)
+    user.save()
+    other_user = User.objects.create_user("other@routes4life.test", password)
+    places = create_places(user, request.param)
+    create_places(other_user, request.param)
+    return SimpleNamespace(user=user, password=password, place=places[0])
+
+
+@pytest.fixture
+def local_media_storage(monkeypatch, tmp_path):
+    storage = FileSystemStorage(location=tmp_path, base_url="/media/")
+    for model, field in ((Place, "main_image"), (PlaceImage, "image")):
+        monkeypatch.setattr(model._meta.get_field(field), "storage", storage)
+
+
+@contextmanager
+def capture_cache_round_trips(monkeypatch):
+    """Names of Redis commands sent, a pipeline is one round trip."""
+    commands = []
+    execute_command = Redis.execute_command
+    execute_pipeline = Pipeline.execute
+
+    def counted_execute_command(self, *args, **kwargs):
+        commands.append(args[0])
+        return execute_command(self, *args, **kwargs)
+
+    def counted_execute_pipeline(self, *args, **kwargs):
+        commands.append("PIPELINE")
+        return execute_pipeline(self, *args, **kwargs)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Redis, "execute_command", counted_execute_command)
+        patch.setattr(Pipeline, "execute", counted_execute_pipeline)
+        yield commands
+
+
+def test_every_url_has_a_budget():
+    budgeted = {budget.url_name for budget in BUDGETS}
+    assert {pattern.name for pattern in urlpatterns} <= budgeted
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("budget", BUDGETS, ids=str)
+def test_endpoint_budget(client, monkeypatch, local_media_storage, dataset, budget):
+    path = reverse(budget.url_name, kwargs=budget.url_kwargs(dataset))
+    data = budget.data(dataset)
+    kwargs = {}
+    if budget.authenticated:
+        kwargs["HTTP_AUTHORIZATION"] = f"JWT {AccessToken.for_user(dataset.user)}"
+    if budget.method != "get" and not budget.multipart:
+        kwargs["content_type"] = "application/json"
+
+    with CaptureQueriesContext(connection) as queries, capture_cache_round_trips(
+        monkeypatch
+    ) as cache_commands:
+        response = getattr(client, budget.method)(path, data, **kwargs)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    assert response.status_code < 300, response.content
+    executed = "\n".join(query["sql"] for query in queries.captured_queries)
+    assert len(queries) <= budget.queries, (
+        f"{budget} ran {len(queries)} queries, the budget is {budget.queries}:\n"
+        f"{executed}"
+    )
+    assert len(cache_commands) <= budget.cache_round_trips, (
+        f"{budget} made {len(cache_commands)} Redis round trips, "
+        f"the budget is {budget.cache_round_trips}: {cache_commands}"
+    )
@@ -0,0 +1,259 @@
+"""
+Plans of the hot place queries on a dataset big enough for the planner
+to prefer indexes. A plan reading all places, or skipping the expected
+indexes, fails the test, as does a plan much costlier than its baseline.
+
+Baselines are kept in query_plan_baselines.json, run the tests with
+UPDATE_QUERY_PLAN_BASELINES=1 to record them after intended changes.
+A plan without a baseline only has its shape checked, with a warning.
+"""
+import json
+import os
+import warnings
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+from routes4life_api.models import Place, User
+from routes4life_api.pagination import PlaceCursorPagination
+from routes4life_api.place_seeding import seed_places
+from routes4life_api.queries import get_top_places_by_category
+from routes4life_api.serializers import PlaceFilterNewSerializer, PlaceFilterSerializer
+from routes4life_api.views import (
+    GetPlacesByOneCategoryAPIView,
+    NearestPlacesAPIView,
+    SearchPlacesAPIView,
+)
+
+BASELINES_PATH = Path(__file__).with_name("query_plan_baselines.json")
+UPDATE_BASELINES = os.environ.get("UPDATE_QUERY_PLAN_BASELINES") == "1"
+# costs are estimates from sampled statistics, so they vary a bit between runs
+COST_TOLERANCE = 1.5
+
+PLACE_TABLE = Place._meta.db_table
+USERS_COUNT = 50
+PLACES_PER_USER = 200
+# below this size a seq scan is cheaper than any index and is fine
+SEQ_SCAN_THRESHOLD = 1000
+# places of a user who saved many, so radius and nearest lookups are more
+# selective than the user's places and must use the location index
+HEAVY_USER_PLACES = 5000
+LOCATION_INDEXES = ("place_location_geog_idx",)
+# indexes every query scoped to one user may pick
+USER_INDEXES = (
+    "place_added_by_id_idx",
+    "place_added_by_name_idx",
+    "place_added_by_rating_idx",
+    "place_added_by_category_idx",
+    # of the added_by foreign key
+    f"{PLACE_TABLE}_added_by_id_",
+)
+
+
+class MissingCostBaselineWarning(UserWarning):
+    pass
+
+
+@pytest.fixture
+def place_dataset():
+    """Places of many users clustered around cities, as seed_places creates them."""
+    user_ids = seed_places(USERS_COUNT, PLACES_PER_USER, seed=42)
+    assert Place.objects.count() > SEQ_SCAN_THRESHOLD
+    return list(User.objects.filter(pk__in=user_ids).order_by("id"))
+
+
+@pytest.fixture
+def heavy_user(place_dataset):
+    (user_id,) = seed_places(1, HEAVY_USER_PLACES, seed=43)
+    return User.objects.get(pk=user_id)
+
+
+def get_view_queryset(view_class, user, query_params=None):
+    """Queryset the list view would serialize for the user."""
+    request = APIRequestFactory().get("/", query_params)
+    force_authenticate(request, user=user)
+    view = view_class()
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    return view.filter_queryset(view.get_queryset())
+
+
+def get_page(queryset):
+    return queryset[: PlaceCursorPagination.page_size + 1]
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return cursor.fetchone()[0][0]["Plan"]
+
+
+def explain_queryset(queryset):
+    return explain(*queryset.query.sql_with_params())
+
+
+def iter_plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from iter_plan_nodes(child)
+
+
+def assert_plan(name, plan, expected_indexes):
+    nodes = list(iter_plan_nodes(plan))
+    seq_scans = [
+        node
+        for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == PLACE_TABLE
+    ]
+    assert not seq_scans, f"{name} reads all places:\n{json.dumps(plan, indent=2)}"
+    used_indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    assert any(
+        index.startswith(expected_indexes) for index in used_indexes
+    ), f"{name} uses none of {expected_indexes}, but {used_indexes or 'no indexes'}"
+
+    baselines = json.loads(BASELINES_PATH.read_text())
+    cost = plan["Total Cost"]
+    if UPDATE_BASELINES:
+        baselines[name] = cost
+        BASELINES_PATH.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + "\n"
+        )
+        return
+    if name not in baselines:
+        # the plan shape is still checked, only the cost isn't compared
+        warnings.warn(
+            f"No cost baseline for {name}, run with UPDATE_QUERY_PLAN_BASELINES=1",
+            MissingCostBaselineWarning,
+        )
+        return
+    assert (
+        cost <= baselines[name] * COST_TOLERANCE
+    ), f"{name} costs {cost}, the baseline is {baselines[name]}"
+
+
+@pytest.mark.django_db
+def test_nearest_places_plan(heavy_user):
+    queryset = get_view_queryset(
+        NearestPlacesAPIView, heavy_user, {"lat": 53.9, "lon": 27.56, "dist": 5}
+    )
+    assert_plan(
+        "nearest_places",
+        explain_queryset(queryset),
+        LOCATION_INDEXES,
+    )
+
+
+@pytest.mark.django_db
+def test_k_nearest_places_plan(heavy_user):
+    queryset = get_view_queryset(
+        NearestPlacesAPIView, heavy_user, {"lat": 53.9, "lon": 27.56, "k": 10}
+    )
+    assert_plan(
+        "k_nearest_places",
+        explain_queryset(queryset),
+        LOCATION_INDEXES,
+    )
+
+
+@pytest.mark.django_db
+def test_search_places_plan(place_dataset):
+    user = place_dataset[0]
+    queryset = get_view_queryset(SearchPlacesAPIView, user, {"search": "old caf"})
+    assert_plan(
+        "search_places",
+        explain_queryset(get_page(queryset)),
+        (
+            "place_search_vector_idx",
+            "place_name_trgm_idx",
+            "place_address_trgm_idx",
+            *USER_INDEXES,
+        ),
+    )
+
+
+@pytest.mark.django_db
+def test_filter_places_plan(heavy_user):
+    serializer = PlaceFilterSerializer(
+        data={
+            "latitude": 53.9,
+            "longitude": 27.56,
+            "distance": 5,
+            "categories": ["art", "city"],
+            "rating": 3,
+            "ordering": "distance",
+        },
+        context={"user": heavy_user},
+    )
+    serializer.is_valid(raise_exception=True)
+    assert_plan(
+        "filter_places",
+        explain_queryset(serializer.get_filters_applied_queryset()),
+        LOCATION_INDEXES,
+    )
+
+
+@pytest.mark.django_db
+def test_filter_places_new_plan(heavy_user):
+    serializer = PlaceFilterNewSerializer(
+        data={
+            "apply_filters": True,
+            "split_categories": False,
+            "latitude": 53.9,
+            "longitude": 27.56,
+            "categories": ["sport"],
+        },
+        context={"user": heavy_user},
+    )
+    serializer.is_valid(raise_exception=True)
+    assert_plan(
+        "filter_places_new",
+        explain_queryset(serializer.get_filters_applied_queryset()),
+        LOCATION_INDEXES,
+    )
+
+
+@pytest.mark.django_db
+def test_filter_places_new_split_plan(heavy_user):
+    serializer = PlaceFilterNewSerializer(
+        data={
+            "apply_filters": False,
+            "split_categories": True,
+            "latitude": 53.9,
+            "longitude": 27.56,
+        },
+        context={"user": heavy_user},
+    )
+    serializer.is_valid(raise_exception=True)
+    places = get_top_places_by_category(serializer.get_filters_applied_queryset(), 10)
+    assert_plan(
+        "filter_places_new_split",
+        explain(places.raw_query, places.params),
+        LOCATION_INDEXES,
+    )
+
+
+@pytest.mark.django_db
+def test_homepage_places_plan(place_dataset):
+    user = place_dataset[0]
+    # as the homepage pages them
+    queryset = user.places.order_by(*PlaceCursorPagination.ordering)
+    assert_plan(
+        "homepage_places",
+        explain_queryset(get_page(queryset)),
+        ("place_added_by_id_idx",),
+    )
+
+
+@pytest.mark.django_db
+def test_places_by_one_category_plan(place_dataset):
+    user = place_dataset[0]
+    queryset = get_view_queryset(
+        GetPlacesByOneCategoryAPIView, user, {"search": "art"}
+    ).order_by(*PlaceCursorPagination.ordering)
+    assert_plan(
+        "places_by_one_category",
+        explain_queryset(get_page(queryset)),
+        USER_INDEXES,
+    )
@@ -0,0 +1,79 @@
+import json
+from decimal import Decimal
+
+import msgpack
+from routes4life_api.renderers import (
+    GeoJSONLinesRenderer,
+    GeoJSONSeqRenderer,
+    MessagePackRenderer,
+)
+
+PLACE = {
+    "id": 1,
+    "added_by": "user@example.com",
+    "rating": Decimal("4.50"),
+    "latitude": 53.901234567,
+    "longitude": 27.561234567,
+    "name": "Old town cafe",
+}
+
+
+class FakeRequest:
+    def __init__(self, **query_params):
+        self.query_params = query_params
+
+
+def test_message_pack_renderer():
+    content = MessagePackRenderer().render([PLACE])
+    assert msgpack.unpackb(content) == [
+        {
+            "id": 1,
+            "addedBy": "user@example.com",
+            "rating": 4.5,
+            "latitude": 53.901234567,
+            "longitude": 27.561234567,
+            "name": "Old town cafe",
+        }
+    ]
+
+    context = {"request": FakeRequest(quantize="true")}
+    place = msgpack.unpackb(
+        MessagePackRenderer().render({"places": [PLACE]}, renderer_context=context)
+    )["places"][0]
+    assert (place["latitude"], place["longitude"]) == (53.901235, 27.561235)
+
+
+def test_geojson_seq_renderer():
+    context = {"request": FakeRequest(quantize="1")}
+    content = GeoJSONSeqRenderer().render(
+        {"filters_applied": False, "cafes": [PLACE], "art": [{**PLACE, "id": 2}]},
+        renderer_context=context,
+    )
+    records = content.split(b"\x1e")
+    assert records[0] == b"" and len(records) == 3
+    assert all(record.endswith(b"\n") for record in records[1:])
+    feature = json.loads(records[1])
+    assert feature == {
+        "type": "Feature",
+        "id": 1,
+        "geometry": {"type": "Point", "coordinates": [27.561235, 53.901235]},
+        "properties": {
+            "addedBy": "user@example.com",
+            "rating": 4.5,
+            "name": "Old town cafe",
+        },
+    }
+    assert json.loads(records[2])["id"] == 2
+    assert GeoJSONSeqRenderer().render([]) == b""
+
+
+def test_geojson_lines_renderer():
+    content = GeoJSONLinesRenderer().render({"places": [PLACE, {**PLACE, "id": 2}]})
+    assert b"\x1e" not in content and content.endswith(b"\n")
+    lines = content.decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2]
+    assert json.loads(lines[0])["geometry"]["coordinates"] == [
+        27.561234567,
+        53.901234567,
+    ]
+    assert GeoJSONLinesRenderer().render([]) == b""